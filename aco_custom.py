@@ -1,6 +1,6 @@
 import time
 import argparse
-import tsplib95 as tsplib
+from instance import load_instance
 from heuristics import AntColony
 from search import local_search
 
@@ -15,7 +15,8 @@ def main():
         '-f',
         type=str,
         required=True,
-        help='Caminho até instância da tsplib.'
+        help='Caminho até instância da tsplib: arquivo .tsp, .tsp.gz ou '+
+        'membro de um arquivo tar (ex.: data/ALL_tsp.tar.gz:a280.tsp).'
     )
     parser.add_argument(
         '-k',
@@ -86,6 +87,59 @@ def main():
         help='Número das k melhores formigas no ACO a serem usadas na atualização do feromônio.'
     )
     
+    parser.add_argument(
+        '--neighbors',
+        type=int,
+        default=None,
+        required=False,
+        help='Tamanho da lista de candidatos (vizinhos mais próximos de cada '+
+        'cidade). Default: todas as cidades.'
+    )
+
+    parser.add_argument(
+        '--lazy-evaporation',
+        action='store_true',
+        required=False,
+        help='Evaporação preguiçosa: feromônio guardado com um fator de escala '+
+        'global, atualizando somente as arestas reforçadas.',
+        default=False
+    )
+
+    parser.add_argument(
+        '--batch',
+        action='store_true',
+        required=False,
+        help='Constrói as rotas de todas as formigas ao mesmo tempo '+
+        '(operações vetorizadas).',
+        default=False
+    )
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        required=False,
+        help='Número de processos usados na construção das rotas. Default: 1.'
+    )
+
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=None,
+        required=False,
+        help='Semente do gerador de números aleatórios da colônia. '+
+        'Default: aleatória.'
+    )
+
+    parser.add_argument(
+        '--time-limit',
+        type=float,
+        default=None,
+        required=False,
+        help='Tempo máximo de execução em segundos. Ao fim do prazo é '+
+        'retornada a melhor solução encontrada. Default: sem limite.'
+    )
+
     parser.add_argument(
         '--exec-data',
         '-e',
@@ -97,8 +151,7 @@ def main():
 
     args = parser.parse_args()
     start = time.time()
-    problem = tsplib.load(args.file)
-    g = problem.get_graph()
+    g = load_instance(args.file)
 
     iter_max = 100
     iter_no_improv = 10
@@ -137,8 +190,10 @@ def main():
     if args.n:
         iter_no_improv = args.n
 
-    heuristic = AntColony(g, k, v, p, pmax, r, nAnts, nBest, iter_max, iter_no_improv)
-    sol, cost = heuristic.find_solution()
+    heuristic = AntColony(g, k, v, p, pmax, r, nAnts, nBest, iter_max, iter_no_improv,
+                          nNeighbors=args.neighbors, lazy_evaporation=args.lazy_evaporation,
+                          batch=args.batch, workers=args.workers, seed=args.seed)
+    sol, cost = heuristic.find_solution(args.time_limit)
     if args.exec_data:
         print(args.k, args.v, p, pmax, r, nAnts, nBest, iter_max, iter_no_improv)
         print(str(sol).replace(' ', ''), cost, '%s' % ((time.time() - start)))
@@ -0,0 +1,152 @@
+"""
+    Leitura de instâncias compactadas: arquivos .gz e membros de arquivos tar
+    (como data/ALL_tsp.tar.gz), sem extrair nada para o disco.
+
+    Um membro de um arquivo tar é indicado por arquivo:membro, por exemplo
+    data/ALL_tsp.tar.gz:a280.tsp; a extensão .gz do membro pode ser omitida.
+    Na primeira leitura o tar é percorrido uma vez e a posição de cada membro
+    (no conteúdo descompactado) é gravada em um índice, ao lado do cache de
+    instâncias (ver cache.py). As leituras seguintes descompactam o tar
+    apenas até o fim do membro pedido: o gzip não permite acesso aleatório,
+    mas o restante do arquivo nunca é lido.
+"""
+import io
+import os
+import gzip
+import json
+import tarfile
+import tempfile
+
+TAR_SUFFIXES = ('.tar', '.tar.gz', '.tgz')
+
+def split_path(path):
+    """
+    Separa um caminho arquivo:membro.
+
+    Return:
+        tuple: caminho do arquivo e nome do membro (None se path não indica
+        um membro de um arquivo tar).
+    """
+    source, sep, member = path.rpartition(':')
+    if sep and member and source.endswith(TAR_SUFFIXES) and os.path.isfile(source):
+        return source, member
+    return path, None
+
+def index_path(source):
+    """
+    Caminho do índice de membros do arquivo tar em source.
+    """
+    root = os.environ.get('TSPD_CACHE_DIR')
+    if not root:
+        root = os.path.join(os.path.dirname(os.path.abspath(source)), '.cache')
+    return os.path.join(root, os.path.basename(source) + '.index.json')
+
+def build_index(source):
+    """
+    Percorre o arquivo tar uma única vez (em modo de fluxo) e registra a
+    posição e o tamanho de cada membro no conteúdo descompactado.
+
+    Return:
+        dict: nome do membro -> [posição, tamanho].
+    """
+    members = {}
+    with tarfile.open(source, 'r|*') as tar:
+        for info in tar:
+            if info.isfile():
+                members[info.name] = [info.offset_data, info.size]
+    return members
+
+def member_index(source):
+    """
+    Índice de membros do arquivo tar, lido do disco ou construído (e gravado)
+    se ainda não existe ou se o arquivo foi modificado.
+    """
+    stat = os.stat(source)
+    stamp = [stat.st_size, stat.st_mtime_ns]
+    path = index_path(source)
+    try:
+        with open(path) as f:
+            index = json.load(f)
+        if index['stamp'] == stamp:
+            return index['members']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    members = build_index(source)
+    tmp = None
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'stamp': stamp, 'members': members}, f)
+        os.replace(tmp, path)
+    except OSError:
+        # sem permissão de escrita: o índice é usado somente nesta execução
+        if tmp is not None and os.path.exists(tmp):
+            os.remove(tmp)
+    return members
+
+def find_member(members, name):
+    """
+    Nome do membro correspondente a name, aceitando a omissão da extensão
+    .gz e do diretório dentro do tar. Sem o diretório, o nome precisa
+    identificar um único membro.
+    """
+    for candidate in (name, name + '.gz'):
+        if candidate in members:
+            return candidate
+    for candidate in (name, name + '.gz'):
+        matches = [m for m in members if os.path.basename(m) == candidate]
+        if len(matches) > 1:
+            raise ValueError('%s ambíguo no arquivo: %s' % (name, ', '.join(sorted(matches))))
+        if matches:
+            return matches[0]
+    raise FileNotFoundError('%s não encontrado no arquivo' % name)
+
+def read_member(source, name):
+    """
+    Conteúdo (bytes) do membro name do arquivo tar em source. O tar é
+    descompactado somente até o fim do membro.
+    """
+    members = member_index(source)
+    name = find_member(members, name)
+    offset, size = members[name]
+    opener = open if source.endswith('.tar') else gzip.open
+    with opener(source, 'rb') as f:
+        f.seek(offset)
+        data = f.read(size)
+    if len(data) != size:
+        raise EOFError('%s truncado no arquivo %s' % (name, source))
+    return name, data
+
+def open_text(path):
+    """
+    Abre uma instância em modo texto, descompactando em fluxo quando
+    necessário: arquivo comum, arquivo .gz ou membro arquivo:membro de um
+    tar (o membro pode também estar compactado).
+
+    Return:
+        file: arquivo aberto em modo texto.
+    """
+    source, member = split_path(path)
+    if member is None:
+        if path.endswith('.gz'):
+            return gzip.open(path, 'rt')
+        return open(path)
+
+    name, data = read_member(source, member)
+    stream = io.BytesIO(data)
+    if name.endswith('.gz'):
+        stream = gzip.GzipFile(fileobj=stream)
+    return io.TextIOWrapper(stream)
+
+def find_instance(name, directory='data'):
+    """
+    Caminho da instância name em directory: o arquivo .tsp, o .tsp.gz ou o
+    membro do arquivo ALL_tsp.tar.gz, nesta ordem.
+    """
+    for path in (os.path.join(directory, name + '.tsp'),
+                 os.path.join(directory, name + '.tsp.gz')):
+        if os.path.isfile(path):
+            return path
+    return os.path.join(directory, 'ALL_tsp.tar.gz') + ':' + name + '.tsp'
@@ -0,0 +1,51 @@
+"""
+    Limite de tempo de execução e notificação das soluções incumbentes,
+    compartilhados por todas as heurísticas.
+"""
+import time
+
+class Budget:
+    """
+    Orçamento de tempo de uma execução. Guarda o instante de inicio, o
+    prazo final (se houver) e a função chamada a cada nova melhor solução.
+
+    Args:
+        time_limit (float): tempo máximo de execução em segundos. None para
+        não limitar.
+        callback (function): chamada como callback(solução, custo, tempo) a
+        cada nova melhor solução, com o tempo decorrido em segundos.
+    """
+    def __init__(self, time_limit=None, callback=None):
+        self.start = time.time()
+        self.deadline = None
+        if time_limit is not None:
+            self.deadline = self.start + time_limit
+        self.callback = callback
+
+    def expired(self):
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def remaining(self):
+        """
+        Tempo restante em segundos, None se não há limite.
+        """
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.time(), 0)
+
+    def elapsed(self):
+        return time.time() - self.start
+
+    def incumbent(self, solution, cost):
+        """
+        Notifica uma nova melhor solução.
+
+        Args:
+            solution (list or function): solução ou função sem argumentos que
+            a retorna, evitando montar a rota quando não há callback.
+            cost (int or float): custo da solução.
+        """
+        if self.callback is not None:
+            if callable(solution):
+                solution = solution()
+            self.callback(solution, cost, self.elapsed())
@@ -0,0 +1,125 @@
+"""
+    Cache em disco das instâncias compiladas. Cada arquivo da tsplib é
+    compilado uma única vez em um diretório identificado pelo hash do seu
+    conteúdo (membros de arquivos tar, pelo arquivo e pelo nome do membro;
+    ver cache_dir), com a matriz de distâncias em formato .npy; execuções
+    seguintes mapeiam a matriz em memória (somente leitura), de forma que
+    processos simultâneos compartilham as mesmas páginas pelo cache de
+    arquivos do sistema operacional.
+
+    O diretório do cache é dado pela variável de ambiente TSPD_CACHE_DIR ou,
+    por padrão, .cache ao lado da instância.
+"""
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+import archive
+
+# versão do formato das entradas; entradas de outras versões são
+# reconstruídas
+FORMAT = 1
+
+def file_hash(path):
+    """
+    Hash (sha256) do conteúdo do arquivo.
+    """
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def cache_dir(path):
+    """
+    Diretório do cache da instância em path. Membros de arquivos tar
+    (arquivo:membro) são identificados pelo caminho, tamanho e data de
+    modificação do arquivo e pelo nome do membro: o hash do tar exigiria
+    lê-lo inteiro a cada instância carregada.
+    """
+    source, member = archive.split_path(path)
+    root = os.environ.get('TSPD_CACHE_DIR')
+    if not root:
+        root = os.path.join(os.path.dirname(os.path.abspath(source)), '.cache')
+    if member is None:
+        key = '%d:%s' % (FORMAT, file_hash(source))
+    else:
+        stat = os.stat(source)
+        key = '%d:%s:%d:%d:%s' % (FORMAT, os.path.abspath(source), stat.st_size,
+                                  stat.st_mtime_ns, member)
+    return os.path.join(root, hashlib.sha256(key.encode()).hexdigest()[:32])
+
+def load(path):
+    """
+    Lê a instância compilada do cache.
+
+    Args:
+        path (str): caminho até instância da tsplib.
+
+    Return:
+        dict: argumentos de Instance (nodes, dist, coords, name,
+        edge_weight_type), com dist mapeada em memória, ou None se a
+        instância não está no cache.
+    """
+    return read_entry(cache_dir(path))
+
+def read_entry(directory):
+    """
+    Lê a entrada do cache em directory (ver load).
+    """
+    try:
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        dist = np.load(os.path.join(directory, 'dist.npy'), mmap_mode='r')
+        coords = None
+        if meta['coords']:
+            coords = np.load(os.path.join(directory, 'coords.npy'))
+        return {
+            'nodes': meta['nodes'],
+            'dist': dist,
+            'coords': coords,
+            'name': meta['name'],
+            'edge_weight_type': meta['edge_weight_type'],
+        }
+    except (OSError, ValueError, KeyError):
+        # entrada incompleta ou gravada em outro formato: reconstruída
+        return None
+
+def store(path, instance):
+    """
+    Grava a instância compilada no cache. A gravação é feita em um
+    diretório temporário renomeado ao final, então leitores concorrentes
+    nunca veem uma entrada incompleta.
+
+    Args:
+        path (str): caminho até instância da tsplib.
+        instance (Instance): instância compilada.
+    """
+    directory = cache_dir(path)
+    if read_entry(directory) is not None:
+        return
+    # entrada inválida (incompleta ou de outro formato) é substituída
+    shutil.rmtree(directory, ignore_errors=True)
+    root = os.path.dirname(directory)
+    tmp = None
+    try:
+        os.makedirs(root, exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=root)
+        np.save(os.path.join(tmp, 'dist.npy'), instance.dist)
+        if instance.coords is not None:
+            np.save(os.path.join(tmp, 'coords.npy'), instance.coords)
+        meta = {
+            'nodes': instance.nodes,
+            'name': instance.name,
+            'edge_weight_type': instance.edge_weight_type,
+            'coords': instance.coords is not None,
+        }
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        os.rename(tmp, directory)
+    except OSError:
+        # sem permissão de escrita ou entrada gravada por outro processo
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
@@ -0,0 +1,152 @@
+"""
+    Conjunto elite de soluções e religação de caminhos (path relinking) para
+    o GRASP.
+"""
+import random
+from array import array
+import numpy as np
+from evaluate import DeltaEvaluator
+
+def edges(tour):
+    """
+    Arestas (não direcionadas) de uma rota, codificadas como
+    menor << 32 | maior em um vetor ordenado de inteiros.
+    """
+    t = np.asarray(tour, dtype=np.int64)
+    u = np.roll(t, -1)
+    return np.sort((np.minimum(t, u) << 32) | np.maximum(t, u))
+
+def distance(a, b):
+    """
+    Número de arestas de a que não estão em b (vetores de edges).
+    """
+    return len(a) - np.intersect1d(a, b, assume_unique=True).size
+
+class ElitePool:
+    """
+    Conjunto de até size soluções boas e diversas. Rotas repetidas são
+    descartadas pelo hash da rota: no TSPd a posição inicial e o sentido
+    definem quais entregas recebem o bônus, então a própria sequência de
+    vértices é a forma canônica da solução. A diversidade é medida pelo
+    número de arestas de uma rota que não estão na outra.
+
+    Para manter muitas soluções em memória a baixo custo, cada rota é
+    guardada em um array('i') (4 bytes por cidade) e suas arestas em um
+    vetor ordenado de inteiros (8 bytes por aresta).
+
+    Uma solução entra no conjunto se ainda há espaço, ou se é melhor que a
+    pior do conjunto e (a menos que seja a melhor de todas) difere de todas
+    em pelo menos minDistance arestas. Ela substitui a solução mais parecida
+    dentre as de custo maior ou igual.
+
+    Args:
+        size (int): número máximo de soluções.
+        minDistance (int): diferença mínima, em arestas, para uma nova
+        solução entrar no conjunto.
+    """
+    def __init__(self, size, minDistance=4):
+        self.size = size
+        self.minDistance = minDistance
+        # (custo, rota, arestas) de cada solução
+        self.members = []
+        self.hashes = set()
+
+    def __len__(self):
+        return len(self.members)
+
+    def add(self, tour, cost):
+        """
+        Tenta inserir uma solução no conjunto.
+
+        Return:
+            bool: se a solução foi inserida.
+        """
+        key = hash(tuple(tour))
+        if key in self.hashes:
+            return False
+
+        tourEdges = edges(tour)
+        if len(self.members) < self.size:
+            self.members.append((cost, array('i', tour), tourEdges))
+            self.hashes.add(key)
+            return True
+
+        worst = max(m[0] for m in self.members)
+        if cost >= worst:
+            return False
+
+        distances = [distance(tourEdges, m[2]) for m in self.members]
+        best = min(m[0] for m in self.members)
+        if cost >= best and min(distances) < self.minDistance:
+            return False
+
+        worse = [i for i, m in enumerate(self.members) if m[0] >= cost]
+        r = min(worse, key=lambda i: distances[i])
+        self.hashes.discard(hash(tuple(self.members[r][1])))
+        self.members[r] = (cost, array('i', tour), tourEdges)
+        self.hashes.add(key)
+        return True
+
+    def sample(self):
+        """
+        Solução do conjunto escolhida de forma uniforme.
+        """
+        return random.choice(self.members)[1].tolist()
+
+    def best(self):
+        """
+        Melhor solução do conjunto e seu custo.
+        """
+        cost, tour, _ = min(self.members, key=lambda m: m[0])
+        return tour.tolist(), cost
+
+def path_relinking(graph, source, guide, k, v):
+    """
+    Religação de caminhos de source em direção a guide. A cada passo, entre
+    as posições em que as rotas diferem, é aplicada a troca (swap) que
+    coloca a cidade da guia na sua posição com menor variação de custo,
+    avaliada de forma incremental. A guia é rotacionada para começar na
+    mesma cidade que source, já que a posição 0 não é alterada pelos
+    movimentos.
+
+    Args:
+        graph (NetworkX.Graph or Instance): grafo ou instância compilada do
+        TSPd.
+        source (list): rota inicial.
+        guide (list): rota guia.
+        k (int): Número de entregas no TSPd
+        v (int): Valor das entregas no TSPd.
+
+    Return:
+        (list, int): melhor rota do caminho (incluindo source) e seu custo.
+    """
+    ev = DeltaEvaluator(graph, source, k, v)
+    t = ev.tour
+    pos = ev.pos
+    target = ev.instance.indices(guide).tolist()
+    r = target.index(t[0])
+    target = target[r:] + target[:r]
+
+    best = None
+    bestCost = ev.cost
+    diff = { p for p in range(1, ev.n) if t[p] != target[p] }
+    while diff:
+        move = None
+        for p in diff:
+            q = pos[target[p]]
+            m = (p, q) if p < q else (q, p)
+            delta = ev.delta_swap(*m)
+            if move is None or delta < moveDelta:
+                move = m
+                moveDelta = delta
+        ev.apply_swap(*move, moveDelta)
+        for p in move:
+            if t[p] == target[p]:
+                diff.discard(p)
+        if ev.cost < bestCost:
+            best = t.copy()
+            bestCost = ev.cost
+
+    if best is None:
+        return list(source), bestCost
+    return ev.instance.route(best), bestCost
@@ -1,5 +1,7 @@
 import argparse
-import tsplib95 as tsplib
+import numpy as np
+from instance import as_instance, load_instance
+from tour import Tour
 
 deliveriesDict = {}
 
@@ -19,19 +21,17 @@ def evaluate(graph, solution, k, v):
     Função que avalia solução para o TSPd.
 
     Args:
-        graph (NetworkX.Graph): Grafo do problema. Estrutura suportada pela 
-    NetworkX lib.
+        graph (NetworkX.Graph or Instance): Grafo do problema. Estrutura
+    suportada pela NetworkX lib ou instância compilada.
+        solution (list): rota (lista de vértices a serem visitados).
         k (int): Número de entregas no TSPd
         v (int): Valor das entregas no TSPd.
 
     Return:
         int or float: avaliação da solução.
     """
-    sCost = 0
-    g = graph
-    nodes = list(g.nodes)
-
-    deliveries = getDeliveries(k, nodes)
+    inst = as_instance(graph)
+    nodes = inst.nodes
 
     # sem solução. default é a solução em ordem
     if len(solution) == 0:
@@ -39,26 +39,215 @@ def evaluate(graph, solution, k, v):
             solution.append(n)
         solution.append(nodes[0])
 
-    for n in range(len(solution)-1):
-        i = solution[n]
-        j = solution[n + 1]
+    s = inst.indices(solution)
+    sCost = inst.distances(s[:-1], s[1:]).sum() + inst.distances(s[-1], s[0])
+
+    if k != 0:
+        # deliveries: índices 2i-1 (coleta) e 2i (entrega), i = 1..k
+        pos = np.full(inst.n, -1, dtype=np.int64)
+        pos[s] = np.arange(len(s))
+        sCost -= v * np.count_nonzero(pos[1:2*k:2] < pos[2:2*k+1:2])
 
-        sCost += g[i][j]['weight'] 
+    return sCost.item()
+
+def evaluate_batch(graph, tours, k, v):
+    """
+    Avalia várias soluções de uma vez.
+
+    Args:
+        graph (NetworkX.Graph or Instance): Grafo do problema. Estrutura
+    suportada pela NetworkX lib ou instância compilada.
+        tours (numpy.ndarray): matriz m x n de rotas em índices da instância.
+        k (int): Número de entregas no TSPd
+        v (int): Valor das entregas no TSPd.
 
-    sCost += g[solution[len(solution)-1]][solution[0]]['weight']
+    Return:
+        numpy.ndarray: avaliação de cada rota.
+    """
+    inst = as_instance(graph)
+    cost = inst.dist[tours, np.roll(tours, -1, axis=1)].sum(axis=1)
 
     if k != 0:
-        # deliveries
-        posDelivery = {}
-        for n in range(len(solution)):
-            i = solution[n]
-            if i in deliveries:
-                posDelivery[i] = n
-        for i in range(1,k+1):
-            if posDelivery[nodes[i*2-1]] < posDelivery[nodes[i*2]]:
-                sCost -= v
-
-    return sCost
+        pos = np.empty_like(tours)
+        pos[np.arange(len(tours))[:, None], tours] = np.arange(tours.shape[1])
+        cost -= v * np.count_nonzero(pos[:, 1:2*k:2] < pos[:, 2:2*k+1:2], axis=1)
+
+    return cost
+
+class DeltaEvaluator:
+    """
+    Avaliação incremental de movimentos sobre uma rota do TSPd. Mantém a rota
+    (Tour, em índices da matriz de distâncias), a posição de cada cidade e o
+    custo atual, de forma que a variação de custo de um movimento 2-opt ou
+    swap é calculada a partir das quatro arestas afetadas e dos pares de
+    entrega envolvidos, sem percorrer a rota. Supõe distâncias simétricas.
+
+    Movimentos:
+        2-opt (i, j): remove as arestas (s[i], s[i+1]) e (s[j], s[j+1]) e
+        inverte o trecho s[i+1..j]. 0 <= i < j-1 <= n-2.
+        swap (p, q): troca as cidades das posições p e q. 0 < p < q < n.
+        or-opt (i, l, j[, reverse]): move o trecho s[i..i+l-1] para entre
+        s[j] e s[j+1], invertido se reverse. 0 < i, i+l <= n e j fora de
+        [i-1, i+l-1].
+
+    Args:
+        graph (NetworkX.Graph or Instance): grafo ou instância compilada do
+        TSPd.
+        solution (list): rota (lista de vértices a serem visitados).
+        k (int): Número de entregas no TSPd
+        v (int): Valor das entregas no TSPd.
+    """
+    def __init__(self, graph, solution, k, v):
+        inst = as_instance(graph)
+        self.instance = inst
+        self.dist = inst.dist
+        self.k = k
+        self.v = v
+        self.tour = Tour(inst.indices(solution).tolist(), inst.n)
+        self.n = len(self.tour)
+        self.pos = self.tour.positions
+        # pares (coleta, entrega) e o par de cada cidade com entrega
+        self.pairs = [(i*2-1, i*2) for i in range(1, k+1)] if v != 0 else []
+        self.pairOf = {}
+        for pair in self.pairs:
+            self.pairOf[pair[0]] = pair
+            self.pairOf[pair[1]] = pair
+        self.cost = evaluate(inst, solution, k, v)
+
+    def delta_2opt(self, i, j):
+        """
+        Variação de custo do movimento 2-opt (i, j).
+        """
+        t = self.tour
+        d = self.dist
+        a = t[i]
+        b = t[i+1]
+        c = t[j]
+        e = t[(j+1) % self.n]
+        delta = d[a, c] + d[b, e] - d[a, b] - d[c, e]
+
+        # pares com coleta e entrega dentro do trecho invertido mudam de ordem
+        pos = self.pos
+        for pickup, delivery in self.pairs:
+            pp = pos[pickup]
+            pd = pos[delivery]
+            if i < pp <= j and i < pd <= j:
+                delta += self.v if pp < pd else -self.v
+        return delta.item()
+
+    def delta_swap(self, p, q):
+        """
+        Variação de custo do movimento swap (p, q).
+        """
+        t = self.tour
+        d = self.dist
+        n = self.n
+
+        def city(x):
+            return t[q] if x == p else t[p] if x == q else t[x]
+
+        delta = 0
+        for e in {(p-1) % n, p, (q-1) % n, q}:
+            f = (e+1) % n
+            delta += d[city(e), city(f)] - d[t[e], t[f]]
+
+        if self.pairs:
+            pos = self.pos
+
+            def moved(x):
+                return q if x == p else p if x == q else x
+
+            pairs = { self.pairOf[c] for c in (t[p], t[q]) if c in self.pairOf }
+            for pickup, delivery in pairs:
+                pp = pos[pickup]
+                pd = pos[delivery]
+                before = pp < pd
+                after = moved(pp) < moved(pd)
+                if before != after:
+                    delta += self.v if before else -self.v
+        return delta.item()
+
+    def delta_oropt(self, i, l, j, reverse=False):
+        """
+        Variação de custo do movimento or-opt (i, l, j), com o trecho
+        reinserido invertido se reverse.
+        """
+        t = self.tour
+        d = self.dist
+        n = self.n
+        prev = t[i-1]
+        first = t[i]
+        last = t[i+l-1]
+        nxt = t[(i+l) % n]
+        a = t[j]
+        b = t[(j+1) % n]
+        if reverse:
+            first, last = last, first
+        delta = (d[prev, nxt] + d[a, first] + d[last, b]
+                 - d[prev, t[i]] - d[t[i+l-1], nxt] - d[a, b])
+
+        # pares com uma cidade no trecho e outra no bloco que ele atravessa
+        # mudam de ordem, assim como pares dentro de um trecho invertido
+        if j > i:
+            lo, hi = i + l, j
+        else:
+            lo, hi = j + 1, i - 1
+        pos = self.pos
+        for pickup, delivery in self.pairs:
+            pp = pos[pickup]
+            pd = pos[delivery]
+            ppSeg = i <= pp < i + l
+            pdSeg = i <= pd < i + l
+            if ((ppSeg and lo <= pd <= hi) or (pdSeg and lo <= pp <= hi)
+                    or (reverse and ppSeg and pdSeg)):
+                delta += self.v if pp < pd else -self.v
+        return delta.item()
+
+    def apply_2opt(self, i, j, delta=None):
+        """
+        Aplica o movimento 2-opt (i, j) na rota e atualiza o custo.
+        """
+        if delta is None:
+            delta = self.delta_2opt(i, j)
+        self.tour.reverse_segment(i+1, j)
+        self.cost += delta
+
+    def apply_swap(self, p, q, delta=None):
+        """
+        Aplica o movimento swap (p, q) na rota e atualiza o custo.
+        """
+        if delta is None:
+            delta = self.delta_swap(p, q)
+        self.tour.swap(p, q)
+        self.cost += delta
+
+    def apply_oropt(self, i, l, j, reverse=False, delta=None):
+        """
+        Aplica o movimento or-opt (i, l, j) na rota e atualiza o custo.
+        """
+        if delta is None:
+            delta = self.delta_oropt(i, l, j, reverse)
+        self.tour.move(i, l, j, reverse)
+        self.cost += delta
+
+    def delta_move(self, kind, move):
+        """
+        Variação de custo de um movimento do tipo kind ('2opt', 'swap' ou
+        'oropt').
+        """
+        return getattr(self, 'delta_' + kind)(*move)
+
+    def apply_move(self, kind, move, delta=None):
+        """
+        Aplica um movimento do tipo kind ('2opt', 'swap' ou 'oropt').
+        """
+        getattr(self, 'apply_' + kind)(*move, delta=delta)
+
+    def solution(self):
+        """
+        Rota atual como lista de vértices da tsplib.
+        """
+        return self.instance.route(self.tour)
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(
@@ -70,7 +259,8 @@ if __name__ == '__main__':
         '-f',
         type=str,
         required=True,
-        help='Caminho até instância da tsplib.'
+        help='Caminho até instância da tsplib: arquivo .tsp, .tsp.gz ou '+
+        'membro de um arquivo tar (ex.: data/ALL_tsp.tar.gz:a280.tsp).'
     )
     parser.add_argument(
         '-k',
@@ -104,7 +294,6 @@ if __name__ == '__main__':
     if args.solution is not None:
         solution = args.solution
 
-    problem = tsplib.load(args.file)
-    g = problem.get_graph()
+    g = load_instance(args.file)
     solEval = evaluate(g, solution, args.k, args.v)
     print(solEval)
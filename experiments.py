@@ -3,6 +3,7 @@ import subprocess
 import argparse
 import csv
 import os
+from archive import find_instance
 
 def create_data_dir(instance):
     instance_dir = 'experiments/{0}'.format(instance)
@@ -118,7 +119,7 @@ def run_instances(instances, no_delivery=False, only_delivery=False, repeat=10):
                             'timestamp'
                         ]
                         csvW = csv.DictWriter(csvf, fieldnames=fields.copy())
-                        instance_path = 'data/{0}.tsp'.format(instance)
+                        instance_path = find_instance(instance)
                         # run heuristic
                         result = subprocess.run(['python', 'local_search1.py', '-f',
                                                  instance_path,'-k', str(k), '-v',
@@ -4,6 +4,7 @@ import argparse
 import csv
 import os
 from tqdm import tqdm
+from archive import find_instance
 
 def create_data_dir(instance):
     instance_dir = 'experiments_grasp/{0}'.format(instance)
@@ -125,7 +126,7 @@ def run_instances(instances, no_delivery=False, only_delivery=False, repeat=10):
                                         'exec_time',
                                         'timestamp']                        
                             csvW = csv.DictWriter(csvf, fieldnames=fields.copy())
-                            instance_path = 'data/{0}.tsp'.format(instance)
+                            instance_path = find_instance(instance)
                             # run heuristic
                             result = subprocess.run(['python',
                                                      'grasp_custom.py',
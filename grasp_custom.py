@@ -1,6 +1,6 @@
 import time
 import argparse
-import tsplib95 as tsplib
+from instance import load_instance
 from heuristics import Grasp
 
 def main():
@@ -14,7 +14,8 @@ def main():
         '-f',
         type=str,
         required=True,
-        help='Caminho até instância da tsplib.'
+        help='Caminho até instância da tsplib: arquivo .tsp, .tsp.gz ou '+
+        'membro de um arquivo tar (ex.: data/ALL_tsp.tar.gz:a280.tsp).'
     )
     parser.add_argument(
         '-k',
@@ -47,6 +48,16 @@ def main():
         help='Porcentagem da CL utilizada na RLC. Valores entre 0 e 1.'
     )
 
+    parser.add_argument(
+        '--strategy',
+        choices=['best', 'first', 'vnd'],
+        default='best',
+        required=False,
+        help='Estratégia da busca local: melhor melhora (best), primeira '+
+        'melhora com don\'t-look bits (first) ou descida em vizinhança '+
+        'variável com swap, 2-opt e or-opt (vnd). Default: best.'
+    )
+
     parser.add_argument( '--solution',
         '-s',
         type=list,
@@ -56,6 +67,41 @@ def main():
         ' Default: solução em ordem.'
     )
     
+    parser.add_argument(
+        '--neighbors',
+        type=int,
+        default=None,
+        required=False,
+        help='Tamanho da lista de candidatos (vizinhos mais próximos de cada '+
+        'cidade). Default: todas as cidades.'
+    )
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        required=False,
+        help='Número de processos que executam iterações do GRASP em paralelo. Default: 1.'
+    )
+
+    parser.add_argument(
+        '--elite',
+        type=int,
+        default=0,
+        required=False,
+        help='Tamanho do conjunto elite usado na religação de caminhos (path '+
+        'relinking). Default: 0 (sem religação).'
+    )
+
+    parser.add_argument(
+        '--time-limit',
+        type=float,
+        default=None,
+        required=False,
+        help='Tempo máximo de execução em segundos. Ao fim do prazo é '+
+        'retornada a melhor solução encontrada. Default: sem limite.'
+    )
+
     parser.add_argument(
         '--exec-data',
         '-e',
@@ -71,8 +117,7 @@ def main():
         sol = args.solution
 
     start = time.time()
-    problem = tsplib.load(args.file)
-    g = problem.get_graph()
+    g = load_instance(args.file)
 
     iter_max = 100
     a = 0.2
@@ -82,8 +127,10 @@ def main():
     if args.a:
         a = args.a
 
-    heuristic = Grasp(g, args.k, args.v, a, iter_max)
-    sol, cost = heuristic.find_solution()
+    heuristic = Grasp(g, args.k, args.v, a, iter_max, strategy=args.strategy,
+                      nNeighbors=args.neighbors, workers=args.workers,
+                      eliteSize=args.elite)
+    sol, cost = heuristic.find_solution(args.time_limit)
     if args.exec_data:
         print(args.k, args.v, iter_max, a)
         print(str(sol).replace(' ', ''), cost, '%s' % ((time.time() - start)))
@@ -1,10 +1,92 @@
-from evaluate import evaluate
+from evaluate import evaluate, evaluate_batch, DeltaEvaluator
+from instance import as_instance
+from pheromone import PheromoneMatrix, LazyPheromoneMatrix
 from solutions import nearest_neighbor2, nearest_neighbor1
-from neighborhoods import neighborhood_2opt
+from neighborhoods import neighborhood_2opt, random_move
 from search import local_search
+from budget import Budget
+from elite import ElitePool, path_relinking
+from tabu import TabuList
+import time
 import random
 from math import exp, ceil
 from operator import itemgetter
+import numpy as np
+from multiprocessing import Pool, shared_memory
+
+def construct_tours(choice, neighbors, nAnts, rng):
+    """
+    Constrói as rotas de nAnts formigas em conjunto: a cada passo todas as
+    formigas escolhem a próxima cidade com uma amostragem vetorizada sobre a
+    informação de escolha, mascarando as cidades já visitadas.
+
+    Args:
+        choice (numpy.ndarray): informação de escolha (n x n).
+        neighbors (numpy.ndarray): lista de candidatos ou None.
+        nAnts (int): número de formigas.
+        rng (numpy.random.Generator): gerador de números aleatórios.
+
+    Return:
+        numpy.ndarray: matriz nAnts x n de rotas em índices da instância.
+    """
+    n = len(choice)
+    ants = np.arange(nAnts)
+
+    tours = np.empty((nAnts, n), dtype=np.int64)
+    tours[:, 0] = rng.integers(n, size=nAnts)
+    visited = np.zeros((nAnts, n), dtype=bool)
+    visited[ants, tours[:, 0]] = True
+
+    for step in range(1, n):
+        current = tours[:, step-1]
+        notVisited = ~visited
+        W = choice[current] * notVisited
+        if neighbors is not None:
+            near = np.zeros((nAnts, n), dtype=bool)
+            near[ants[:, None], neighbors[current]] = True
+            near &= notVisited
+            # formigas com todos os vizinhos próximos visitados
+            # consideram todas as cidades
+            restrict = near.any(axis=1)
+            W[restrict] *= near[restrict]
+
+        P = np.cumsum(W, axis=1)
+        # candidatos a distância 0 (cidades repetidas): escolha uniforme
+        zero = P[:, -1] == 0
+        if zero.any():
+            W[zero] = notVisited[zero]
+            P[zero] = np.cumsum(notVisited[zero], axis=1)
+
+        # U em [0, 1), mas U * P[:, -1] pode ser arredondado para P[:, -1]:
+        # nesse caso a escolha é a última cidade com probabilidade positiva
+        r = rng.random(nAnts) * P[:, -1]
+        last = n - 1 - np.argmax(W[:, ::-1] > 0, axis=1)
+        nxt = np.minimum(np.count_nonzero(P <= r[:, None], axis=1), last)
+        tours[:, step] = nxt
+        visited[ants, nxt] = True
+
+    return tours
+
+def draw(P, u):
+    """
+    Sorteia uma posição pela soma acumulada P, com u em [0, 1).
+    """
+    # u * P[-1] pode ser arredondado para P[-1]: nesse caso a escolha é a
+    # última posição com probabilidade positiva
+    return min(np.searchsorted(P, u * P[-1], side='right'), np.searchsorted(P, P[-1]))
+
+# estado de cada processo da colônia paralela
+_ant_worker = {}
+
+def _init_ant_worker(name, n, neighbors):
+    shm = shared_memory.SharedMemory(name=name)
+    _ant_worker['shm'] = shm
+    _ant_worker['choice'] = np.ndarray((n, n), dtype=np.float64, buffer=shm.buf)
+    _ant_worker['neighbors'] = neighbors
+
+def _construct_ants(nAnts, seed):
+    rng = np.random.default_rng(seed)
+    return construct_tours(_ant_worker['choice'], _ant_worker['neighbors'], nAnts, rng)
 
 class AntColony:
     """
@@ -14,7 +96,7 @@ class AntColony:
     solução.
 
     Args:
-    graph (NetworkX.Graph): grafo do TSPd.
+    graph (NetworkX.Graph or Instance): grafo ou instância compilada do TSPd.
     k (int): Número de entregas no TSPd
     v (int): Valor das entregas no TSPd.
     pheromone_rate (float): influência do feromônio na escolha da
@@ -27,11 +109,36 @@ class AntColony:
     atualização do feromônio.
     iterMax (int): número máximo de iterações .
     iterNoImproveMax (int): número máximo de iterações sem melhora.
+    nNeighbors (int): tamanho da lista de candidatos. Quando fornecido, cada
+    formiga escolhe a próxima cidade entre os nNeighbors vizinhos mais
+    próximos ainda não visitados, considerando todas as cidades somente se
+    todos já foram visitados.
+    lazy_evaporation (bool): usa LazyPheromoneMatrix, em que a evaporação é um
+    fator global e o reforço toca somente as arestas das melhores formigas.
+    batch (bool): constrói as rotas de todas as formigas ao mesmo tempo com
+    operações vetorizadas (construct_batch).
+    workers (int): número de processos usados na construção das rotas. Com
+    mais de um processo as formigas são divididas entre eles e construídas
+    em lote, cada processo com seu próprio gerador de números aleatórios.
+    seed (int): semente do gerador de números aleatórios da colônia
+    (numpy.random.Generator), do qual vêm o feromônio inicial, as escolhas
+    das formigas e as sementes dos processos. Default: sorteada do gerador
+    global do módulo random, de forma que random.seed torna a execução
+    reprodutível.
     """
     def __init__(self, graph, k, v, pheromone_rate=0.8, pheromone_max=1, evaporation_rate=0.02,
-                 nAnts=20, nBest=3, iterMax = 10**4, iterNoImproveMax = 10):
-        self.pheromone_matrix = {}
-        self.graph = graph
+                 nAnts=20, nBest=3, iterMax = 10**4, iterNoImproveMax = 10, nNeighbors=None,
+                 lazy_evaporation=False, batch=False, workers=1, seed=None):
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.rng = np.random.default_rng(seed)
+        self.pheromone_matrix = None
+        self.batch = batch
+        self.workers = workers
+        self.lazy_evaporation = lazy_evaporation
+        self.choice_info = None
+        self.choice_rates = None
+        self.graph = as_instance(graph)
         self.k = k
         self.v = v
         self.pheromone_rate = pheromone_rate
@@ -42,11 +149,13 @@ class AntColony:
         self.nBest = nBest
         self.iterMax = iterMax
         self.iterNoImproveMax = iterNoImproveMax
-        self.tabu = {}
+        self.tabu = TabuList()
+        self.neighbors = None
+        if nNeighbors:
+            self.neighbors = self.graph.nearest_neighbors(nNeighbors)
 
     def evaporation(self):
-        for edge in self.pheromone_matrix:
-            self.pheromone_matrix[edge] *= 1 - self.evaporation_rate
+        self.pheromone_matrix.evaporate(self.evaporation_rate)
         if self.pheromone_rate < self.pheromone_max:
             newp = self.pheromone_rate * (1 + self.evaporation_rate)
             self.pheromone_rate = newp if newp < self.pheromone_max else self.pheromone_max
@@ -63,81 +172,195 @@ class AntColony:
             if best == 0:
                 s_best = s
                 cost = sCost
-            for i in range(0, len(s)-1):
-                edge = (s[i], s[i+1])
-                self.pheromone_matrix[edge] += 1/cost
+            idx = self.graph.indices(s)
+            self.pheromone_matrix.reinforce(idx[:-1], idx[1:], 1/cost)
 
         return s_best, cost
 
-    def construct(self):
-        s = []
-        g = self.graph
-        nodes = list(g.nodes())
-        start_node = random.choice(nodes)
-        s.append(start_node)
-        visited = {
-            start_node: True
-        }
-
+    def update_choice_info(self):
+        """
+        Calcula a informação de escolha (feromônio^a * distância^b) usada
+        por todas as formigas da iteração. Quando as taxas não mudaram e o
+        armazenamento de feromônio informa as arestas reforçadas, somente
+        essas entradas são recalculadas.
+        """
         t = self.pheromone_matrix
+        d = self.graph.dist
         a = self.pheromone_rate
         b = self.heuristic_rate
+        if self.choice_info is None:
+            self.choice_info = (t.relative()**a) * (d**b)
+        elif t.touched is None or self.choice_rates != (a, b):
+            # escrita no próprio buffer, que pode estar em memória compartilhada
+            self.choice_info[...] = (t.relative()**a) * (d**b)
+        else:
+            tau = t.relative()
+            for rows, cols in t.touched:
+                self.choice_info[rows, cols] = (tau[rows, cols]**a) * (d[rows, cols]**b)
+        self.choice_rates = (a, b)
+        t.touched = []
+
+    def construct(self):
+        g = self.graph
+        start_node = int(self.rng.integers(g.n))
+        s = [start_node]
+        visited = np.zeros(g.n, dtype=bool)
+        visited[start_node] = True
 
-        while len(visited) != len(nodes):
+        choice = self.choice_info
+
+        for step in range(g.n - 1):
             i = s[len(s)-1]
 
-            candidates = []
-            P = []
-            pDivisor = 0
-            for j in g[i]:
-                edge = (i,j)
-                isCandidate = j not in visited
-                if isCandidate:
-                    pDividend = (t[edge]**a) * (g[i][j]['weight']**b)
-                    pDivisor += pDividend
-                    candidates.append(j)
-                    P.append(pDividend)
-            P = [p/pDivisor for p in P]
-            candidate = random.choices(candidates, weights=P, k=1)[0]
+            candidates = None
+            if self.neighbors is not None:
+                near = self.neighbors[i]
+                near = near[~visited[near]]
+                # todos os vizinhos próximos já visitados: considera todas as cidades
+                if len(near) > 0:
+                    candidates = near
+            if candidates is None:
+                candidates = np.flatnonzero(~visited)
+
+            # amostragem pela soma acumulada, sem normalizar as probabilidades
+            P = np.cumsum(choice[i, candidates])
+            # candidatos a distância 0 (cidades repetidas): escolha uniforme
+            if P[-1] == 0:
+                P = np.arange(1, len(candidates) + 1, dtype=np.float64)
+            candidate = candidates[draw(P, self.rng.random())]
             if len(candidates) > 1:
                 for nTry in range(3):
-                    if candidate not in self.tabu:
+                    if g.nodes[candidate] not in self.tabu:
                         break
-                    candidate = random.choices(candidates, weights=P, k=1)[0]
+                    candidate = candidates[draw(P, self.rng.random())]
+            candidate = int(candidate)
 
             visited[candidate] = True
             s.append(candidate)
 
+        s = g.route(s)
         return s, self.evaluate_sol(s)
 
+    def construct_batch(self, nAnts):
+        """
+        Constrói as rotas de nAnts formigas em conjunto: a cada passo todas
+        as formigas escolhem a próxima cidade com uma amostragem vetorizada
+        sobre a informação de escolha, mascarando as cidades já visitadas.
+
+        Args:
+            nAnts (int): número de formigas.
+
+        Return:
+            list: pares (rota, custo) de cada formiga.
+        """
+        tours = construct_tours(self.choice_info, self.neighbors, nAnts, self.rng)
+        return self.evaluate_tours(tours)
+
+    def construct_parallel(self, pool, seeds):
+        """
+        Constrói as rotas das formigas em paralelo. Cada processo do pool lê a
+        informação de escolha da memória compartilhada e constrói um grupo de
+        formigas com seu próprio gerador de números aleatórios.
+
+        Args:
+            pool (multiprocessing.Pool): processos iniciados com
+            _init_ant_worker.
+            seeds (list): uma numpy.random.SeedSequence por processo.
+
+        Return:
+            list: pares (rota, custo) de cada formiga.
+        """
+        workers = len(seeds)
+        groups = [self.nAnts // workers + (w < self.nAnts % workers) for w in range(workers)]
+        tasks = [(nAnts, seed) for nAnts, seed in zip(groups, seeds) if nAnts > 0]
+        tours = np.concatenate(pool.starmap(_construct_ants, tasks))
+        return self.evaluate_tours(tours)
+
+    def evaluate_tours(self, tours):
+        g = self.graph
+        costs = evaluate_batch(g, tours, self.k, self.v)
+        return [(g.route(t), c) for t, c in zip(tours.tolist(), costs.tolist())]
+
     def init_pheromone_matrix(self):
-        for e in self.graph.edges():
-            self.pheromone_matrix[(e[0],e[1])] = random.uniform(0.01, 1)
-            self.pheromone_matrix[(e[1],e[0])] = random.uniform(0.01, 1)
+        if self.lazy_evaporation:
+            self.pheromone_matrix = LazyPheromoneMatrix(self.graph.n, rng=self.rng)
+        else:
+            self.pheromone_matrix = PheromoneMatrix(self.graph.n, rng=self.rng)
 
     def evaluate_sol(self, s):
         return evaluate(self.graph, s, self.k, self.v)
 
-    def find_solution(self):
+    def find_solution(self, time_limit=None, callback=None):
         """
         Otimização por colônia de formigas. Utiliza os parâmetros fornecidos
         para determinar as rotas construidas pelas formigas, atualizando
         a matrix de feromônios de forma off-line e elitista.
 
+        Args:
+        time_limit (float): tempo máximo de execução em segundos. Ao fim do
+        prazo é retornada a melhor solução encontrada até então.
+        callback (function): chamada como callback(solução, custo, tempo) a
+        cada nova melhor solução.
+
         Return:
         (list, float): solução (rota) com cidades a serem visitadas e custo da
         solução.
         """
+        budget = Budget(time_limit, callback)
         self.init_pheromone_matrix()
+        if self.workers <= 1:
+            return self.optimize(budget=budget)
+
+        # informação de escolha publicada uma vez por iteração em memória
+        # compartilhada com os processos que constroem as rotas
+        n = self.graph.n
+        shm = shared_memory.SharedMemory(create=True, size=n*n*8)
+        try:
+            self.choice_info = np.ndarray((n, n), dtype=np.float64, buffer=shm.buf)
+            self.choice_rates = None
+            with Pool(self.workers, initializer=_init_ant_worker,
+                      initargs=(shm.name, n, self.neighbors)) as pool:
+                return self.optimize(pool, budget)
+        finally:
+            self.choice_info = None
+            shm.close()
+            shm.unlink()
+
+    def optimize(self, pool=None, budget=None):
+        """
+        Laço principal da colônia de formigas.
+
+        Args:
+            pool (multiprocessing.Pool): processos usados na construção das
+            rotas (ver find_solution). None para construção sequencial.
+            budget (Budget): limite de tempo e notificação de novas soluções.
+
+        Return:
+        (list, float): solução (rota) com cidades a serem visitadas e custo da
+        solução.
+        """
+        if budget is None:
+            budget = Budget()
+        self.update_choice_info()
         best, cost = self.construct()
+        budget.incumbent(best, cost)
         S = []
         for ant in range(self.nAnts):
             S.append([])
+        seeds = np.random.SeedSequence(int(self.rng.integers(2**63)))
 
         iter_no_improv = 0
         for it in range(self.iterMax):
-            for ant in range(self.nAnts):
-                S[ant] = self.construct()
+            if budget.expired():
+                break
+            self.update_choice_info()
+            if pool is not None:
+                S = self.construct_parallel(pool, seeds.spawn(self.workers))
+            elif self.batch:
+                S = self.construct_batch(self.nAnts)
+            else:
+                for ant in range(self.nAnts):
+                    S[ant] = self.construct()
             
             new_s, new_cost = self.reinforcement(S)
             if new_cost < cost:
@@ -146,6 +369,7 @@ class AntColony:
                     iter_no_improv +=1
                 best = new_s
                 cost = new_cost
+                budget.incumbent(best, cost)
             else:
                 iter_no_improv += 1
 
@@ -156,6 +380,66 @@ class AntColony:
 
         return best, cost
 
+def markov_chain(ev, T, length, moves, bestCost, budget=None, rng=random):
+    """
+    Cadeia de Markov do Simulated Annealing: sorteia length movimentos
+    aleatórios, avaliados em O(1), e aceita cada um pelo critério de
+    Metropolis à temperatura T.
+
+    Args:
+        ev (DeltaEvaluator): estado da cadeia, modificado no lugar.
+        T (float): temperatura.
+        length (int): número de movimentos.
+        moves (tuple): tipos de movimento sorteados.
+        bestCost (int): custo a ser superado.
+        budget (Budget): limite de tempo (consultado a cada 1024 movimentos)
+        e notificação de novas soluções.
+        rng (random.Random): gerador dos movimentos e do critério de
+        aceitação. Default: o gerador global do módulo random.
+
+    Return:
+        (list, int): melhor rota (em índices) com custo menor que bestCost
+        encontrada na cadeia e seu custo; (None, bestCost) se não houver.
+    """
+    best = None
+    for it in range(length):
+        if budget is not None and it & 1023 == 0 and budget.expired():
+            break
+        kind, move = random_move(ev.n, moves, rng)
+        delta = ev.delta_move(kind, move)
+        if delta < 0 or rng.random() < exp(-delta/T):
+            ev.apply_move(kind, move, delta)
+            if ev.cost < bestCost:
+                best = ev.tour.copy()
+                bestCost = ev.cost
+                if budget is not None:
+                    budget.incumbent(ev.solution, ev.cost)
+    return best, bestCost
+
+# estado de cada processo do parallel tempering
+_tempering_worker = {}
+
+def _init_tempering_worker(graph, k, v, moves):
+    _tempering_worker['args'] = (graph, k, v)
+    _tempering_worker['moves'] = moves
+
+def _tempering_chain(s, T, length, seed, deadline):
+    # gerador próprio da cadeia: com um único processo a cadeia roda no
+    # processo principal e não pode alterar o gerador global usado nas trocas
+    rng = random.Random(int(seed.generate_state(1)[0]))
+    graph, k, v = _tempering_worker['args']
+    ev = DeltaEvaluator(graph, s, k, v)
+    cost = ev.cost
+    # somente o prazo (instante absoluto, comum às cadeias que rodam em
+    # sequência): as novas melhores soluções são notificadas pelo processo
+    # principal ao fim da rodada
+    budget = Budget(None if deadline is None else deadline - time.time())
+    best, bestCost = markov_chain(ev, T, length, _tempering_worker['moves'], cost,
+                                  budget, rng)
+    if best is None:
+        return ev.solution(), ev.cost, s, cost
+    return ev.solution(), ev.cost, graph.route(best), bestCost
+
 class SimulatedAnnealing:
     """
     Classe que implementa a otimização por utilizando Simulated Annealing.
@@ -163,55 +447,220 @@ class SimulatedAnnealing:
     de iterações sem melhora da solução.
 
     Args:
-        graph (NetworkX.Graph): grafo do TSPd.
+        graph (NetworkX.Graph or Instance): grafo ou instância compilada do
+        TSPd.
         Tmax (float): Temperatura máxima. Entre 0  e 1.
         Tmin (float): Temperatura mínima. Valor entre 0 e 1.
         r (float): Taxa de resfriamento. Valor entre 0 e 1.
         iterMax (int): número máximo de iterações .
         iterNoImproveMax (int): número máximo de iterações sem melhora.
+        chainLength (int): tamanho da cadeia de Markov. Quando fornecido, a
+        cada temperatura são sorteados chainLength movimentos aleatórios
+        (avaliados de forma incremental) em vez de percorrer toda a
+        vizinhança 2-opt.
+        moves (tuple): tipos de movimento sorteados quando chainLength é
+        fornecido: '2opt', 'swap' e 'oropt'.
     """
-    def __init__(self, graph, s0, k, v, Tmax, Tmin, r):
-        self.graph = graph
+    def __init__(self, graph, s0, k, v, Tmax, Tmin, r, chainLength=None,
+                 moves=('2opt', 'swap', 'oropt')):
+        self.graph = as_instance(graph)
         self.s0 = s0
         self.k = k
         self.v = v
         self.Tmax = Tmax
         self.Tmin = Tmin
         self.r = r
+        self.chainLength = chainLength
+        self.moves = moves
 
     def candidate_cost(self, s):
         return evaluate(self.graph, s, self.k, self.v)
 
-    def candidates(self, neighbors):
-        return sorted(neighbors, key=self.candidate_cost)
+    def candidates(self, evaluator, neighbors):
+        return sorted(((m, evaluator.delta_2opt(*m)) for m in neighbors),
+                      key=itemgetter(1))
 
-    def candidate(self, neighbors):
-        return max(neighbors, key=self.candidate_cost)
+    def candidate(self, evaluator, neighbors):
+        return max(((m, evaluator.delta_2opt(*m)) for m in neighbors),
+                   key=itemgetter(1))
 
-    def find_solution(self):
+    def find_solution(self, time_limit=None, callback=None):
         """
         Executar otimização. Utiliza os parâmetros fornecidos
         para determinar as rotas construidas pelas formigas, atualizando
         a matrix de feromônios de forma off-line e elitista.
 
+        Args:
+            time_limit (float): tempo máximo de execução em segundos. Ao fim
+            do prazo é retornada a melhor solução encontrada.
+            callback (function): chamada como callback(solução, custo, tempo)
+            a cada nova melhor solução.
+
         Return:
-            (list, float): solução (rota) com cidades a serem visitadas e custo da
-            solução.
+            (list, float): melhor solução (rota) encontrada e seu custo.
         """
-        s = self.s0
-        cost = evaluate(self.graph, s, self.k, self.v)
+        budget = Budget(time_limit, callback)
+        if self.chainLength:
+            return self.anneal(budget)
+
+        ev = DeltaEvaluator(self.graph, self.s0, self.k, self.v)
+        best = ev.tour.copy()
+        bestCost = ev.cost
+        budget.incumbent(ev.solution, ev.cost)
         T = self.Tmax
         it = 0
-        while T >= self.Tmin:
-            candidate = self.candidate(neighborhood_2opt(self.graph, s))
-            cCost = evaluate(self.graph, candidate, self.k, self.v)
-            delta = cCost - cost
-            if cCost < cost or random.randint(0,99)/100 < exp(-delta/T): 
-                s = candidate.copy()
-                cost = cCost
+        while T >= self.Tmin and not budget.expired():
+            move, delta = self.candidate(ev, neighborhood_2opt(self.graph, ev.tour))
+            if delta < 0 or random.randint(0,99)/100 < exp(-delta/T):
+                ev.apply_2opt(*move, delta)
+                if ev.cost < bestCost:
+                    best = ev.tour.copy()
+                    bestCost = ev.cost
+                    budget.incumbent(ev.solution, ev.cost)
             it +=1
             T = T*(1-self.r)
-        return s, cost
+        return self.graph.route(best), bestCost
+
+    def anneal(self, budget=None):
+        """
+        Simulated Annealing com movimentos aleatórios: a cada temperatura são
+        sorteados chainLength movimentos, cada um avaliado em O(1) e aceito
+        pelo critério de Metropolis.
+
+        Args:
+            budget (Budget): limite de tempo e notificação de novas soluções.
+
+        Return:
+            (list, float): melhor solução (rota) encontrada e seu custo.
+        """
+        if budget is None:
+            budget = Budget()
+        ev = DeltaEvaluator(self.graph, self.s0, self.k, self.v)
+        best = ev.tour.copy()
+        bestCost = ev.cost
+        budget.incumbent(ev.solution, ev.cost)
+        T = self.Tmax
+        while T >= self.Tmin and not budget.expired():
+            tour, cost = markov_chain(ev, T, self.chainLength, self.moves,
+                                      bestCost, budget)
+            if tour is not None:
+                best = tour
+                bestCost = cost
+            T = T*(1-self.r)
+        return self.graph.route(best), bestCost
+
+class ParallelTempering(SimulatedAnnealing):
+    """
+    Simulated Annealing com várias cadeias (parallel tempering). nChains
+    cadeias de Markov rodam em processos separados, cada uma com temperatura
+    fixa em uma escala geométrica entre Tmax e Tmin. Após cada rodada de
+    chainLength movimentos, cadeias de temperaturas vizinhas trocam de estado
+    com probabilidade min(1, exp((Ei - Ej)(1/Ti - 1/Tj))), de forma que boas
+    soluções descem para as temperaturas baixas e as altas continuam
+    diversificando. Todas as cadeias partem de s0.
+
+    Args:
+        graph (NetworkX.Graph or Instance): grafo ou instância compilada do
+        TSPd.
+        Tmax (float): Temperatura da cadeia mais quente.
+        Tmin (float): Temperatura da cadeia mais fria.
+        chainLength (int): movimentos de cada cadeia por rodada.
+        nChains (int): número de cadeias.
+        rounds (int): número de rodadas (cada uma seguida de trocas).
+        workers (int): número de processos. Default: número de cadeias.
+        moves (tuple): tipos de movimento sorteados: '2opt', 'swap' e 'oropt'.
+    """
+    def __init__(self, graph, s0, k, v, Tmax, Tmin, chainLength, nChains=4,
+                 rounds=100, workers=None, moves=('2opt', 'swap', 'oropt')):
+        super().__init__(graph, s0, k, v, Tmax, Tmin, 0, chainLength, moves)
+        self.nChains = nChains
+        self.rounds = rounds
+        self.workers = workers or nChains
+        if nChains > 1:
+            self.temperatures = [Tmax * (Tmin/Tmax)**(i/(nChains-1))
+                                 for i in range(nChains)]
+        else:
+            self.temperatures = [Tmin]
+
+    def exchange(self, states, parity):
+        """
+        Tenta trocar os estados das cadeias vizinhas (i, i+1), com i de
+        paridade parity.
+
+        Args:
+            states (list): (rota, custo) atual de cada cadeia, da mais quente
+            para a mais fria.
+            parity (int): 0 ou 1.
+        """
+        T = self.temperatures
+        for i in range(parity, self.nChains-1, 2):
+            x = (states[i][1] - states[i+1][1]) * (1/T[i] - 1/T[i+1])
+            if x >= 0 or random.random() < exp(x):
+                states[i], states[i+1] = states[i+1], states[i]
+
+    def find_solution(self, time_limit=None, callback=None):
+        """
+        Executar otimização.
+
+        Args:
+            time_limit (float): tempo máximo de execução em segundos,
+            verificado também dentro das cadeias (a cada 1024 movimentos).
+            callback (function): chamada como callback(solução, custo, tempo)
+            a cada nova melhor solução.
+
+        Return:
+            (list, float): melhor solução (rota) encontrada e seu custo.
+        """
+        budget = Budget(time_limit, callback)
+        cost = evaluate(self.graph, self.s0, self.k, self.v)
+        best = self.s0
+        bestCost = cost
+        states = [(self.s0, cost)] * self.nChains
+        budget.incumbent(best, bestCost)
+        seeds = np.random.SeedSequence(random.getrandbits(63))
+
+        initargs = (self.graph, self.k, self.v, self.moves)
+        pool = None
+        if self.workers > 1:
+            pool = Pool(self.workers, initializer=_init_tempering_worker,
+                        initargs=initargs)
+        else:
+            _init_tempering_worker(*initargs)
+        try:
+            for it in range(self.rounds):
+                if budget.expired():
+                    break
+                tasks = [(s, T, self.chainLength, seed, budget.deadline) for (s, _), T, seed
+                         in zip(states, self.temperatures, seeds.spawn(self.nChains))]
+                if pool is not None:
+                    results = pool.starmap(_tempering_chain, tasks)
+                else:
+                    results = [_tempering_chain(*task) for task in tasks]
+
+                states = []
+                for s, sCost, chainBest, chainBestCost in results:
+                    states.append((s, sCost))
+                    if chainBestCost < bestCost:
+                        best = chainBest
+                        bestCost = chainBestCost
+                        budget.incumbent(best, bestCost)
+                self.exchange(states, it % 2)
+        finally:
+            if pool is not None:
+                pool.terminate()
+        return best, bestCost
+
+# estado de cada processo do GRASP paralelo
+_grasp_worker = {}
+
+def _init_grasp_worker(grasp):
+    _grasp_worker['grasp'] = grasp
+
+def _grasp_iteration(tabu, seed, time_limit):
+    random.seed(int(seed.generate_state(1)[0]))
+    grasp = _grasp_worker['grasp']
+    grasp.tabu = tabu
+    return grasp.iteration(time_limit)
 
 class Grasp:
     """
@@ -222,43 +671,136 @@ class Grasp:
     solução.
 
     Args:
-        graph (NetworkX.Graph): grafo do TSPd.
+        graph (NetworkX.Graph or Instance): grafo ou instância compilada do
+        TSPd.
         a (float): Porcentagem da CL utilizada na RCL. Valores entre 0 e 1
         iterMax (int): número máximo de iterações .
         iterNoImproveMax (int): número máximo de iterações sem melhora.
+        strategy (str): estratégia da busca local, 'best' (melhor melhora),
+        'first' (primeira melhora com don't-look bits) ou 'vnd' (descida em
+        vizinhança variável).
+        nNeighbors (int): tamanho da lista de candidatos. Quando fornecido, a
+        CL e a vizinhança da busca local são restritas aos nNeighbors vizinhos
+        mais próximos de cada cidade.
+        workers (int): número de processos. Quando maior que 1, cada rodada
+        executa workers iterações (construção e busca local) em paralelo e
+        os resultados atualizam a melhor solução, o contador de iterações sem
+        melhora e a lista tabu na ordem das iterações.
+        eliteSize (int): tamanho do conjunto elite. Quando fornecido, cada
+        ótimo local é religado (path relinking) a uma solução do conjunto
+        elite, a melhor solução do caminho passa pela busca local e o
+        resultado é candidato a entrar no conjunto.
     """
-    def __init__(self, graph, k, v, a, iterMax=100, iterNoImproveMax=10):
-        self.graph = graph
+    def __init__(self, graph, k, v, a, iterMax=100, iterNoImproveMax=10, strategy='best',
+                 nNeighbors=None, workers=1, eliteSize=0):
+        self.graph = as_instance(graph)
         self.k = k
         self.v = v
         self.a = a
         self.iterMax = iterMax
         self.iterNoImproveMax = iterNoImproveMax
-        self.tabu = {}
-        self.nodes = list(graph.nodes())
+        self.strategy = strategy
+        self.tabu = TabuList()
+        self.nodes = self.graph.nodes
+        self.neighbors = None
+        if nNeighbors:
+            self.neighbors = self.graph.nearest_neighbors(nNeighbors)
+        self.order = self.graph.sorted_neighbors()
+        self.workers = workers
+        self.elite = None
+        if eliteSize:
+            self.elite = ElitePool(eliteSize)
 
     def candidate_cost(self, s):
         return evaluate(self.graph, s, self.k, self.v)
 
+    def rcl_size(self, clSize):
+        """
+        Tamanho da RCL para uma CL de clSize cidades.
+        """
+        rclSize = ceil(clSize*self.a)
+        if rclSize < 3:
+            rclSize = clSize
+        return rclSize
+
+    def sorted_slices(self, u):
+        """
+        Índice de vizinhos pré-ordenado de u convertido em fatias de tamanho
+        crescente, para que a RCL percorra somente o início da linha.
+        """
+        row = self.order[u]
+        p = 0
+        step = 32
+        while p < len(row):
+            yield row[p:p+step].tolist()
+            p += step
+            step *= 2
+
     def rcl(self, node, visited):
+        """
+        Lista restrita de candidatos (RCL): as ceil(a·|CL|) cidades mais
+        próximas de node na CL (cidades não visitadas e não tabu), em ordem
+        crescente de distância. A RCL é obtida percorrendo o índice de
+        vizinhos pré-ordenado da instância até completar o tamanho, sem
+        ordenar nem montar a CL: |CL| é o número de cidades não visitadas
+        menos as cidades tabu encontradas no percurso. Se todas as cidades
+        não visitadas são tabu, o tabu é ignorado.
+
+        Args:
+            node (int): cidade atual.
+            visited (dict): cidades já visitadas.
+
+        Return:
+            list: pares (cidade, distância) da RCL.
+        """
         g = self.graph
-        cl = []
-        clNotVisited = []
-        for i in g[node]:
-            notTabu = (node,i) not in self.tabu or self.tabu[(node,i)] == 0
-            notVisisted = i not in visited
-            if notVisisted:
-                clNotVisited.append((node,i))
-                if notTabu:
-                    cl.append((i, g[node][i]['weight']))
+        nodes = self.nodes
+        u = g.index[node]
+        size = len(nodes) - len(visited)
+        order = None
+        if self.neighbors is not None:
+            near = [ii for ii in self.neighbors[u].tolist() if nodes[ii] not in visited]
+            # todos os vizinhos próximos já visitados: considera todas as cidades
+            if near:
+                order = [near]
+                size = len(near)
+
+        rcl = self.walk(node, order or self.sorted_slices(u), visited, size, True)
         # ignore tabu if edge is needed
-        if len(cl) == 0:
-            cl = clNotVisited
-        rclSize = ceil(len(cl)*self.a)
-        if rclSize < 3:
-            return sorted(cl, key=lambda i: i[1])
+        if not rcl:
+            rcl = self.walk(node, order or self.sorted_slices(u), visited, size, False)
+        return rcl
 
-        return sorted(cl, key=lambda i: i[1])[:rclSize]
+    def walk(self, node, order, visited, size, useTabu):
+        """
+        Percorre order (fatias de índices em ordem crescente de distância)
+        coletando as cidades admissíveis até completar a RCL.
+        """
+        nodes = self.nodes
+        is_tabu = self.tabu.is_tabu
+        # lista tabu vazia: nenhuma cidade é bloqueada
+        useTabu = useTabu and bool(self.tabu)
+        rclSize = self.rcl_size(size)
+        blocked = 0
+        picked = []
+        for chunk in order:
+            for ii in chunk:
+                i = nodes[ii]
+                if i in visited:
+                    continue
+                if useTabu and is_tabu((node, i)):
+                    blocked += 1
+                    rclSize = self.rcl_size(size - blocked)
+                else:
+                    picked.append(ii)
+                if len(picked) >= rclSize:
+                    break
+            else:
+                continue
+            break
+        picked = picked[:rclSize]
+        w = self.graph.dist[self.graph.index[node]]
+        return [(nodes[ii], d) for ii, d in zip(picked, w[picked].tolist())]
 
     def construct(self):
         s = []
@@ -278,41 +820,213 @@ class Grasp:
 
     def update_tabu_list(self, s):
         t = random.randint(0, len(s)-1)
-        for move in self.tabu:
-            if self.tabu[move] > 0:
-                self.tabu[move] -= 1
-        self.tabu[(self.nodes[t], self.nodes[(t+1)%len(s)])] = 2
+        self.tabu.step()
+        self.tabu.add((self.nodes[t], self.nodes[(t+1)%len(s)]), 2)
 
-    def find_solution(self):
+    def find_solution(self, time_limit=None, callback=None):
         """
         Executar heurística. Utiliza os parâmetros fornecidos
         para determinar as rotas construidas pelas formigas, atualizando
         a matrix de feromônios de forma off-line e elitista.
 
+        Args:
+            time_limit (float): tempo máximo de execução em segundos. Ao fim
+            do prazo é retornada a melhor solução encontrada até então.
+            callback (function): chamada como callback(solução, custo, tempo)
+            a cada nova melhor solução.
+
         Return:
             (list, float): solução (rota) com cidades a serem visitadas e custo da
             solução.
         """
+        budget = Budget(time_limit, callback)
         s = nearest_neighbor1(self.graph)
         cost = evaluate(self.graph, s, self.k, self.v)
+        budget.incumbent(s, cost)
+        pool = None
+        if self.workers > 1:
+            pool = Pool(self.workers, initializer=_init_grasp_worker, initargs=(self,))
+            seeds = np.random.SeedSequence(random.getrandbits(63))
         it = 0
         iterNoImprove = 0
-        while it < self.iterMax:
-            s1 = self.construct()
-            s1, s1Cost = local_search(self.graph, s1, self.k, self.v, self.iterMax, self.iterMax*0.1, tabu=self.tabu)
+        try:
+            while it < self.iterMax and not budget.expired():
+                if pool is None:
+                    results = [self.iteration(budget.remaining())]
+                else:
+                    size = min(self.workers, self.iterMax - it)
+                    tasks = [(self.tabu, seed, budget.remaining())
+                             for seed in seeds.spawn(size)]
+                    results = pool.starmap(_grasp_iteration, tasks)
+
+                for s1, s1Cost in results:
+                    if self.elite is not None:
+                        s1, s1Cost = self.relink(s1, s1Cost, budget.remaining())
+                    if s1Cost < cost:
+                        improv_rate = 1 - s1Cost/cost
+                        if improv_rate < 0.01:
+                            iterNoImprove +=1
+                        s = s1
+                        cost = s1Cost
+                        budget.incumbent(s, cost)
+                    else:
+                        iterNoImprove += 1
+
+                    self.update_tabu_list(s1)
+                    it +=1
+                    if iterNoImprove > self.iterNoImproveMax:
+                        break
+                if iterNoImprove > self.iterNoImproveMax:
+                    break
+        finally:
+            if pool is not None:
+                pool.terminate()
 
+        return s, cost
+
+    def relink(self, s, cost, time_limit=None):
+        """
+        Religa o ótimo local s a uma solução do conjunto elite e atualiza o
+        conjunto.
+
+        Return:
+            (list, float): melhor solução entre s e o resultado da busca
+            local a partir do melhor ponto do caminho, e seu custo.
+        """
+        if len(self.elite) > 0:
+            s1, s1Cost = path_relinking(self.graph, s, self.elite.sample(), self.k, self.v)
             if s1Cost < cost:
-                improv_rate = 1 - s1Cost/cost
-                if improv_rate < 0.01:
-                    iterNoImprove +=1
+                s1, s1Cost = local_search(self.graph, s1, self.k, self.v, self.iterMax,
+                                          self.iterMax*0.1, tabu=self.tabu,
+                                          strategy=self.strategy,
+                                          neighbors=self.neighbors,
+                                          time_limit=time_limit)
                 s = s1
                 cost = s1Cost
-            else:
-                iterNoImprove += 1
+        self.elite.add(s, cost)
+        return s, cost
 
-            self.update_tabu_list(s1)
-            it +=1
-            if iterNoImprove > self.iterNoImproveMax:
+    def iteration(self, time_limit=None):
+        """
+        Uma iteração do GRASP: construção aleatória gulosa seguida de busca
+        local.
+
+        Return:
+            (list, float): ótimo local encontrado e seu custo.
+        """
+        s1 = self.construct()
+        return local_search(self.graph, s1, self.k, self.v, self.iterMax, self.iterMax*0.1,
+                            tabu=self.tabu, strategy=self.strategy,
+                            neighbors=self.neighbors, time_limit=time_limit)
+
+class TabuSearch:
+    """
+    Classe que implementa a busca tabu sobre a vizinhança 2-opt restrita à
+    lista de candidatos. A cada iteração é aplicado o melhor movimento
+    admissível, mesmo que piore a solução; as arestas removidas ficam tabu
+    por tenure iterações (um movimento é tabu se recria alguma delas). O
+    critério de aspiração admite um movimento tabu que leve a uma solução
+    melhor que a melhor encontrada. Os movimentos são avaliados de forma
+    incremental. Critério de parada é atingir o número máximo de iterações ou
+    número máximo de iterações sem melhora da melhor solução.
+
+    Args:
+        graph (NetworkX.Graph or Instance): grafo ou instância compilada do
+        TSPd.
+        s0 (list): solução inicial. Default: vizinho mais próximo.
+        tenure (int): número de iterações em que uma aresta removida é tabu.
+        iterMax (int): número máximo de iterações.
+        iterNoImproveMax (int): número máximo de iterações sem melhora.
+        nNeighbors (int): tamanho da lista de candidatos. None para a
+        vizinhança 2-opt completa.
+    """
+    def __init__(self, graph, k, v, s0=None, tenure=10, iterMax=1000, iterNoImproveMax=100,
+                 nNeighbors=10):
+        self.graph = as_instance(graph)
+        self.k = k
+        self.v = v
+        self.s0 = s0
+        self.tenure = tenure
+        self.iterMax = iterMax
+        self.iterNoImproveMax = iterNoImproveMax
+        self.neighbors = None
+        if nNeighbors:
+            self.neighbors = self.graph.nearest_neighbors(nNeighbors)
+
+    def select(self, ev, tabu, bestCost):
+        """
+        Melhor movimento 2-opt admissível: não tabu ou que satisfaz o
+        critério de aspiração.
+
+        Return:
+            ((int, int), int): movimento e variação de custo, ou (None, 0)
+            se todos os movimentos são tabu.
+        """
+        t = ev.tour
+        n = ev.n
+        move = None
+        moveDelta = 0
+        for i, j in neighborhood_2opt(self.graph, t, neighbors=self.neighbors, pos=ev.pos):
+            delta = ev.delta_2opt(i, j)
+            if move is not None and delta >= moveDelta:
+                continue
+            a, b, c, e = t[i], t[i+1], t[j], t[(j+1) % n]
+            isTabu = ((min(a, c), max(a, c)) in tabu or
+                      (min(b, e), max(b, e)) in tabu)
+            if isTabu and ev.cost + delta >= bestCost:
+                continue
+            move = (i, j)
+            moveDelta = delta
+        return move, moveDelta
+
+    def find_solution(self, time_limit=None, callback=None):
+        """
+        Executar busca tabu.
+
+        Args:
+            time_limit (float): tempo máximo de execução em segundos. Ao fim
+            do prazo é retornada a melhor solução encontrada até então.
+            callback (function): chamada como callback(solução, custo, tempo)
+            a cada nova melhor solução.
+
+        Return:
+            (list, float): melhor solução (rota) encontrada e seu custo.
+        """
+        budget = Budget(time_limit, callback)
+        s0 = self.s0
+        if s0 is None:
+            s0 = nearest_neighbor1(self.graph)
+        ev = DeltaEvaluator(self.graph, s0, self.k, self.v)
+        t = ev.tour
+        n = ev.n
+        best = t.copy()
+        bestCost = ev.cost
+        budget.incumbent(ev.solution, ev.cost)
+
+        tabu = TabuList()
+        iterNoImprove = 0
+        for it in range(self.iterMax):
+            if budget.expired():
+                break
+            move, delta = self.select(ev, tabu, bestCost)
+            if move is None:
                 break
 
-        return s, cost
+            i, j = move
+            a, b, c, e = t[i], t[i+1], t[j], t[(j+1) % n]
+            tabu.step()
+            tabu.add((min(a, b), max(a, b)), self.tenure)
+            tabu.add((min(c, e), max(c, e)), self.tenure)
+            ev.apply_2opt(i, j, delta)
+
+            if ev.cost < bestCost:
+                best = t.copy()
+                bestCost = ev.cost
+                iterNoImprove = 0
+                budget.incumbent(ev.solution, ev.cost)
+            else:
+                iterNoImprove += 1
+                if iterNoImprove > self.iterNoImproveMax:
+                    break
+
+        return self.graph.route(best), bestCost
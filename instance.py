@@ -0,0 +1,290 @@
+"""
+    Representação compilada de uma instância do TSPd: matriz de distâncias
+    densa (NumPy) e mapeamento entre os vértices da tsplib e índices da matriz.
+"""
+import numpy as np
+import cache
+import archive
+import tsp_reader
+
+class Instance:
+    """
+    Instância compilada do TSPd. Substitui o grafo da NetworkX nas funções de
+    avaliação, vizinhança e construção de soluções: o custo de uma aresta é
+    lido diretamente de uma matriz contígua em vez de três consultas a
+    dicionários.
+
+    Em instâncias muito grandes a matriz não cabe na memória (d18512 ocupa
+    2,7 GB e pla85900, 59 GB); instâncias com coordenadas podem então ser
+    carregadas sem ela (ver load_instance) e as distâncias são calculadas sob
+    demanda por distances e distance_function. Somente a busca local com
+    rota em lista de dois níveis (ver search.two_level_search), a solução
+    inicial pelo vizinho mais próximo, a avaliação de soluções e as listas de
+    candidatos funcionam sem a matriz.
+
+    Args:
+        nodes (list): vértices da instância, na ordem da tsplib.
+        dist (numpy.ndarray): matriz n x n de distâncias entre os vértices,
+        indexada pela posição do vértice em nodes. None para calcular as
+        distâncias a partir de coords.
+        coords (numpy.ndarray): coordenadas (n x 2) dos vértices, quando a
+        instância as fornece.
+        name (str): nome da instância.
+        edge_weight_type (str): tipo de distância da tsplib (EUC_2D, GEO...).
+    """
+    def __init__(self, nodes, dist, coords=None, name=None, edge_weight_type=None):
+        self.nodes = list(nodes)
+        self.n = len(self.nodes)
+        self.dist = None
+        if dist is not None:
+            self.dist = np.ascontiguousarray(dist)
+        self.coords = coords
+        self.name = name
+        self.edge_weight_type = edge_weight_type
+        self.index = { node: i for i, node in enumerate(self.nodes) }
+        # vértices da tsplib são inteiros, então o mapeamento vértice -> índice
+        # também é mantido em um vetor para converter rotas inteiras de uma vez
+        self.lookup = np.full(max(self.nodes) + 1, -1, dtype=np.int64)
+        self.lookup[self.nodes] = np.arange(self.n)
+        self._nearest = {}
+        self._sorted = None
+
+    @classmethod
+    def from_problem(cls, problem):
+        """
+        Compila uma instância a partir de um problema carregado pela tsplib95
+        sem construir o grafo da NetworkX.
+
+        Args:
+            problem (tsplib95.models.StandardProblem): problema da tsplib.
+
+        Return:
+            Instance: instância compilada.
+        """
+        nodes = list(problem.get_nodes())
+        n = len(nodes)
+        dist = np.empty((n, n), dtype=np.int64)
+        for a in range(n):
+            for b in range(n):
+                dist[a][b] = problem.get_weight(nodes[a], nodes[b])
+
+        coords = None
+        if problem.node_coords:
+            coords = np.array([problem.node_coords[i] for i in nodes], dtype=np.float64)
+
+        return cls(nodes, dist, coords, problem.name, problem.edge_weight_type)
+
+    @classmethod
+    def from_graph(cls, graph):
+        """
+        Compila uma instância a partir de um grafo da NetworkX.
+
+        Args:
+            graph (NetworkX.Graph): Grafo do problema. Estrutura suportada pela
+        NetworkX lib.
+
+        Return:
+            Instance: instância compilada.
+        """
+        nodes = list(graph.nodes)
+        index = { node: i for i, node in enumerate(nodes) }
+        n = len(nodes)
+        dist = np.zeros((n, n), dtype=np.int64)
+        for a in range(n):
+            for b, edge in graph[nodes[a]].items():
+                dist[a][index[b]] = edge['weight']
+
+        coords = None
+        if all(graph.nodes[i].get('coord') is not None for i in nodes):
+            coords = np.array([graph.nodes[i]['coord'] for i in nodes], dtype=np.float64)
+
+        return cls(nodes, dist, coords, graph.graph.get('name'))
+
+    def nearest_neighbors(self, size):
+        """
+        Lista de candidatos: os size vizinhos mais próximos de cada vértice,
+        em ordem crescente de distância. Calculada uma única vez por tamanho.
+        Quando a instância tem coordenadas com distância monótona na
+        euclidiana (EUC_2D, CEIL_2D, ATT) e a scipy está disponível, usa uma
+        KD-tree; caso contrário percorre as distâncias em blocos de linhas,
+        lidas da matriz ou calculadas a partir das coordenadas.
+
+        Args:
+            size (int): número de vizinhos de cada vértice.
+
+        Return:
+            numpy.ndarray: matriz n x size com os índices dos vizinhos.
+        """
+        size = min(size, self.n - 1)
+        if size in self._nearest:
+            return self._nearest[size]
+
+        euclidean = self.edge_weight_type in ('EUC_2D', 'CEIL_2D', 'ATT')
+        cKDTree = None
+        if self.coords is not None and euclidean:
+            # importada aqui: a scipy é opcional e lenta para importar
+            try:
+                from scipy.spatial import cKDTree
+            except ImportError:
+                pass
+        if cKDTree is not None:
+            _, nearest = cKDTree(self.coords).query(self.coords, k=size+1)
+            # remove o próprio vértice (pode não ser o primeiro se houver
+            # cidades com as mesmas coordenadas)
+            rows = np.arange(self.n)[:, None]
+            self_mask = nearest == rows
+            self_mask[~self_mask.any(axis=1), -1] = True
+            nearest = nearest[~self_mask].reshape(self.n, size)
+        else:
+            # em blocos de linhas, sem copiar a matriz inteira
+            nearest = np.empty((self.n, size), dtype=np.int64)
+            every = np.arange(self.n)
+            for a in range(0, self.n, tsp_reader.BLOCK):
+                b = min(a + tsp_reader.BLOCK, self.n)
+                d = self.distances(every[a:b]).astype(np.float64)
+                rows = np.arange(b - a)[:, None]
+                d[rows[:, 0], every[a:b]] = np.inf
+                block = np.argpartition(d, size-1, axis=1)[:, :size]
+                order = np.argsort(d[rows, block], axis=1, kind='stable')
+                nearest[a:b] = block[rows, order]
+
+        nearest = np.ascontiguousarray(nearest, dtype=np.int64)
+        self._nearest[size] = nearest
+        return nearest
+
+    def sorted_neighbors(self):
+        """
+        Índice de adjacência: para cada vértice, todos os vértices em ordem
+        crescente de distância, com empates na ordem da tsplib (o próprio
+        vértice aparece entre os primeiros). Calculado uma única vez.
+
+        Return:
+            numpy.ndarray: matriz n x n com os índices dos vértices.
+        """
+        if self._sorted is None:
+            self._sorted = np.argsort(self.dist, axis=1, kind='stable').astype(np.int32)
+        return self._sorted
+
+    def distances(self, rows, cols=None):
+        """
+        Distâncias entre os vértices de índices rows e cols, lidas da matriz
+        ou calculadas a partir das coordenadas quando a instância não tem a
+        matriz. Índices são combinados como na indexação da NumPy
+        (self.dist[rows, cols]).
+
+        Args:
+            rows (int or numpy.ndarray): índices de origem.
+            cols (int or numpy.ndarray): índices de destino. None para as
+            linhas inteiras: distâncias de cada índice de rows a todos os
+            vértices (como self.dist[rows]).
+
+        Return:
+            numpy.ndarray: distâncias.
+        """
+        if self.dist is not None:
+            if cols is None:
+                return self.dist[rows]
+            return self.dist[rows, cols]
+        if cols is None:
+            rows = np.asarray(rows)[..., None]
+            cols = slice(None)
+        return tsp_reader.coord_distances(self.coords, self.edge_weight_type, rows, cols)
+
+    def distance_function(self):
+        """
+        Função d(i, j) com a distância (int) entre os vértices de índices i e
+        j, para laços que consultam um par de cada vez.
+        """
+        if self.dist is not None:
+            return self.dist.item
+        return tsp_reader.distance_function(self.coords, self.edge_weight_type)
+
+    def has_edge(self, i, j):
+        """
+        Verifica se existe aresta entre os vértices i e j. Instâncias da
+        tsplib são grafos completos, então basta que ambos existam.
+        """
+        return i in self.index and j in self.index
+
+    def weight(self, i, j):
+        """
+        Custo da aresta entre os vértices i e j (vértices da tsplib).
+        """
+        return self.distances(self.index[i], self.index[j]).item()
+
+    def indices(self, solution):
+        """
+        Converte uma rota de vértices da tsplib em um vetor de índices da
+        matriz de distâncias.
+
+        Args:
+            solution (list): rota (lista de vértices).
+
+        Return:
+            numpy.ndarray: índices dos vértices na matriz de distâncias.
+        """
+        return self.lookup[np.asarray(solution, dtype=np.int64)]
+
+    def route(self, indices):
+        """
+        Converte um vetor de índices em uma rota de vértices da tsplib.
+        """
+        nodes = self.nodes
+        return [nodes[i] for i in indices]
+
+def as_instance(graph):
+    """
+    Retorna a instância compilada correspondente ao grafo. Instâncias são
+    retornadas sem modificação; grafos da NetworkX são compilados uma única vez
+    e a instância fica guardada nos atributos do próprio grafo.
+
+    Args:
+        graph (NetworkX.Graph or Instance): grafo ou instância do TSPd.
+
+    Return:
+        Instance: instância compilada.
+    """
+    if isinstance(graph, Instance):
+        return graph
+
+    instance = graph.graph.get('instance')
+    if instance is None:
+        instance = Instance.from_graph(graph)
+        graph.graph['instance'] = instance
+    return instance
+
+def load_instance(path, use_cache=True, dense=True):
+    """
+    Lê uma instância da tsplib e a compila diretamente, sem passar pelo grafo
+    da NetworkX (ver tsp_reader.py; formatos não suportados pelo leitor são
+    lidos pela tsplib95). A instância compilada fica guardada no cache em
+    disco (ver cache.py) e as leituras seguintes mapeiam a matriz de
+    distâncias em memória em vez de reprocessar o arquivo.
+
+    Args:
+        path (str): caminho até instância da tsplib: arquivo .tsp, .tsp.gz ou
+        membro de um arquivo tar (arquivo:membro, ver archive.py).
+        use_cache (bool): usa o cache em disco.
+        dense (bool): calcula a matriz de distâncias. Quando False, instâncias
+        com coordenadas que ainda não estão no cache são carregadas sem a
+        matriz (ver Instance) e não são guardadas no cache.
+
+    Return:
+        Instance: instância compilada.
+    """
+    if use_cache:
+        cached = cache.load(path)
+        if cached is not None:
+            return Instance(**cached)
+
+    try:
+        instance = Instance(**tsp_reader.load(path, dense))
+    except tsp_reader.Unsupported:
+        # formatos não suportados pelo leitor próprio; a tsplib95 é importada
+        # somente neste caso
+        import tsplib95 as tsplib
+        with archive.open_text(path) as f:
+            instance = Instance.from_problem(tsplib.parse(f.read()))
+    if use_cache and instance.dist is not None:
+        cache.store(path, instance)
+    return instance
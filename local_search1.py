@@ -1,6 +1,6 @@
 import time
 import argparse
-import tsplib95 as tsplib
+from instance import load_instance
 from evaluate import evaluate
 from search import local_search
 from solutions import nearest_neighbor1
@@ -16,7 +16,8 @@ def main():
         '-f',
         type=str,
         required=True,
-        help='Caminho até instância da tsplib.'
+        help='Caminho até instância da tsplib: arquivo .tsp, .tsp.gz ou '+
+        'membro de um arquivo tar (ex.: data/ALL_tsp.tar.gz:a280.tsp).'
     )
     parser.add_argument(
         '-k',
@@ -44,6 +45,46 @@ def main():
         ' Default: solução em ordem.'
     )
 
+    parser.add_argument(
+        '--strategy',
+        choices=['best', 'first', 'vnd'],
+        default='best',
+        required=False,
+        help='Estratégia da busca local: melhor melhora (best), primeira '+
+        'melhora com don\'t-look bits (first) ou descida em vizinhança '+
+        'variável com swap, 2-opt e or-opt (vnd). Default: best.'
+    )
+
+    parser.add_argument(
+        '--neighbors',
+        type=int,
+        default=None,
+        required=False,
+        help='Tamanho da lista de candidatos (vizinhos mais próximos de cada '+
+        'cidade). Default: todas as cidades.'
+    )
+
+    parser.add_argument(
+        '--tour',
+        choices=['array', '2level'],
+        default='array',
+        required=False,
+        help='Representação da rota na busca local: vetor (array) ou lista '+
+        'de dois níveis (2level), com movimentos 2-opt em O(sqrt n), para '+
+        'instâncias grandes. 2level usa a primeira melhora com lista de '+
+        'candidatos e, em instâncias com coordenadas, calcula as distâncias '+
+        'sob demanda em vez de montar a matriz n x n. Default: array.'
+    )
+
+    parser.add_argument(
+        '--time-limit',
+        type=float,
+        default=None,
+        required=False,
+        help='Tempo máximo de execução em segundos. Ao fim do prazo é '+
+        'retornada a melhor solução encontrada. Default: sem limite.'
+    )
+
     parser.add_argument(
         '--exec-data',
         '-e',
@@ -59,13 +100,17 @@ def main():
         sol = args.solution
 
     start = time.time()
-    problem = tsplib.load(args.file)
-    g = problem.get_graph()
+    g = load_instance(args.file, dense=args.tour == 'array')
     sol = nearest_neighbor1(g)
     cost = evaluate(g, sol, args.k, args.v)
     iter_max = 10**4
     iter_no_improve_max = 100
-    sol, cost = local_search(g, sol, args.k, args.v, iter_max, iter_no_improve_max)
+    neighbors = None
+    if args.neighbors:
+        neighbors = g.nearest_neighbors(args.neighbors)
+    sol, cost = local_search(g, sol, args.k, args.v, iter_max, iter_no_improve_max,
+                             strategy=args.strategy, neighbors=neighbors,
+                             time_limit=args.time_limit, tour=args.tour)
     if args.exec_data:
         print(args.k, args.v)
         print(str(sol).replace(' ', ''), cost, '%s' % (time.time() - start))
@@ -1,82 +1,314 @@
+import random
+from instance import as_instance
+from tabu import TabuList
+
 def valid_route(graph, route):
     """
     Função que valida se uma rota é valida no grafo.
 
     Args:
-        graph (NetworkX.Graph): Grafo do problema. Estrutura suportada pela 
-    NetworkX lib.
+        graph (NetworkX.Graph or Instance): Grafo do problema. Estrutura
+    suportada pela NetworkX lib ou instância compilada.
         route (list): lista de nós a serem percorridos na rota
 
     Return:
         bool: True se a rota é valida e False se contrário.
     """
+    inst = as_instance(graph)
     for i in range(len(route)-1):
-        if route[i+1] not in graph[route[i]]:
+        if not inst.has_edge(route[i], route[i+1]):
             return False
     return True
 
-def neighborhood_swap(graph, sol, tabu={}):
+def is_tabu(tabu, edge):
+    """
+    Verifica se a aresta está ativa na lista tabu (TabuList ou dicionário
+    aresta -> iterações restantes).
+    """
+    if isinstance(tabu, TabuList):
+        return tabu.is_tabu(edge)
+    return edge in tabu and tabu[edge] > 0
+
+def neighborhood_swap(graph, sol, tabu={}, neighbors=None, pos=None):
+    """
+    Função que gera a vizinhança swap de forma preguiçosa. Cada vizinho é
+    descrito pelo movimento (p, q): troca das cidades nas posições p e q. A
+    primeira cidade da rota não é movida.
+
+    Args:
+        graph (NetworkX.Graph or Instance): Grafo do problema. Estrutura
+    suportada pela NetworkX lib ou instância compilada.
+        sol (list): Solução atual em índices da instância (ver
+        DeltaEvaluator.tour).
+        tabu (TabuList or dict): arestas tabu (pares de vértices da tsplib).
+        neighbors (numpy.ndarray): lista de candidatos. Quando fornecida, só
+        são gerados movimentos que colocam uma cidade ao lado de um de seus
+        vizinhos próximos.
+        pos (list): posição de cada cidade na rota. Calculada se não for
+        fornecida.
+
+    Return:
+        generator: movimentos (p, q) da vizinhança da solução fornecida.
+    """
+    nodes = as_instance(graph).nodes
+    n = len(sol)
+    if neighbors is not None:
+        if pos is None:
+            pos = positions(sol)
+        seen = set()
+        for p in range(1, n):
+            for c in neighbors[sol[p]]:
+                for q in (pos[c]-1, pos[c]+1):
+                    if q == p or q <= 0 or q >= n:
+                        continue
+                    move = (p, q) if p < q else (q, p)
+                    if move in seen:
+                        continue
+                    seen.add(move)
+                    if tabu and is_tabu(tabu, (nodes[sol[move[1]]], nodes[sol[move[0]]])):
+                        continue
+                    yield move
+        return
+
+    for p in range(1, n-1):
+        for q in range(p+1, n):
+            if tabu and is_tabu(tabu, (nodes[sol[q]], nodes[sol[p]])):
+                continue
+            yield p, q
+
+def positions(sol):
+    """
+    Posição de cada cidade (índice da instância) na rota.
+    """
+    pos = [0] * (max(sol) + 1)
+    for p, c in enumerate(sol):
+        pos[c] = p
+    return pos
+
+def candidate_2opt(sol, e, neighbors, pos):
+    """
+    Posições f das arestas que, removidas junto com a aresta e em um
+    movimento 2-opt, criam uma aresta entre a cidade e um de seus vizinhos
+    mais próximos.
+    """
+    n = len(sol)
+    # nova aresta (sol[e], c)
+    for c in neighbors[sol[e]]:
+        yield pos[c]
+    # nova aresta (sol[e+1], c)
+    for c in neighbors[sol[(e+1)%n]]:
+        yield (pos[c]-1) % n
+
+def neighborhood_2opt(graph, sol, tabu={}, neighbors=None, pos=None):
+    """
+    Função que gera a vizinhança 2-opt de forma preguiçosa. Cada vizinho é
+    descrito pelo movimento (i, j): remove as arestas (sol[i], sol[i+1]) e
+    (sol[j], sol[j+1]) e inverte o trecho sol[i+1..j]. Movimentos que criam
+    uma aresta tabu são ignorados. O movimento (0, n-1), que apenas percorre
+    o mesmo ciclo no sentido oposto, não faz parte da vizinhança.
+
+    Args:
+        graph (NetworkX.Graph or Instance): Grafo do problema. Estrutura
+    suportada pela NetworkX lib ou instância compilada.
+        sol (list): Solução atual em índices da instância (ver
+        DeltaEvaluator.tour).
+        tabu (TabuList or dict): arestas tabu (pares de vértices da tsplib).
+        neighbors (numpy.ndarray): lista de candidatos (ver
+        Instance.nearest_neighbors). Quando fornecida, só são gerados
+        movimentos que criam uma aresta entre vizinhos próximos.
+        pos (list): posição de cada cidade na rota. Calculada se não for
+        fornecida.
+
+    Return:
+        generator: movimentos (i, j) da vizinhança da solução fornecida.
+    """
+    nodes = as_instance(graph).nodes
+    n = len(sol)
+    if neighbors is not None:
+        if pos is None:
+            pos = positions(sol)
+        seen = set()
+        for e in range(n):
+            for f in candidate_2opt(sol, e, neighbors, pos):
+                if abs(e - f) < 2:
+                    continue
+                move = (e, f) if e < f else (f, e)
+                # (0, n-1) só inverte o sentido da rota
+                if move == (0, n-1) or move in seen:
+                    continue
+                seen.add(move)
+                if tabu and tabu_2opt(nodes, sol, *move, tabu):
+                    continue
+                yield move
+        return
+
+    for i in range(0, n-2):
+        for j in range(i+2, n - (i == 0)):
+            if tabu and tabu_2opt(nodes, sol, i, j, tabu):
+                continue
+            yield i, j
+
+def neighborhood_2opt_edge(graph, sol, e, tabu={}, neighbors=None, pos=None):
     """
-    Função que calcula vizinhança 2-opt.
+    Movimentos 2-opt que removem a aresta (sol[e], sol[e+1]), usados pela
+    busca local com don't-look bits.
 
     Args:
-        graph (NetworkX.Graph): Grafo do problema. Estrutura suportada pela 
-    NetworkX lib.
-        sol (list): Solução inicial, rota (lista de nós
-        a serem visitados) inicial.
+        graph (NetworkX.Graph or Instance): Grafo do problema. Estrutura
+    suportada pela NetworkX lib ou instância compilada.
+        sol (list): Solução atual em índices da instância.
+        e (int): posição da aresta removida.
+        tabu (TabuList or dict): arestas tabu (pares de vértices da tsplib).
+        neighbors (numpy.ndarray): lista de candidatos (ver
+        Instance.nearest_neighbors).
+        pos (list): posição de cada cidade na rota, obrigatória quando
+        neighbors é fornecida.
 
     Return:
-        list: lista de vizinhos da solução fornecida.
-    """
-    neighbors = []
-    neighbor = sol.copy()
-    for i in range(0, len(sol)-3):
-        for j in range(i+2, len(sol)-(i==0)):
-            jf = (j+1)%len(sol)
-            edge = (neighbor[j], neighbor[i+1])
-            isNeighbor = sol[j] in graph[sol[i]] and sol[jf] in graph[sol[i+1]]
-            isTabu = True if edge in tabu and tabu[edge] > 0 else False
-            if isNeighbor and not isTabu:
-                neighbor[i+1], neighbor[j] = neighbor[j], neighbor[i+1]
-                neighbors.append(neighbor.copy())
-                neighbor[i+1], neighbor[j] = neighbor[j], neighbor[i+1]
-            
-    return neighbors
-
-def neighborhood_2opt(graph, sol, tabu={}):
-    """
-    Função que calcula vizinhança 2-opt.
+        generator: movimentos (i, j) que removem a aresta e.
+    """
+    nodes = as_instance(graph).nodes
+    n = len(sol)
+    others = range(n) if neighbors is None else candidate_2opt(sol, e, neighbors, pos)
+    for f in others:
+        if abs(e - f) < 2:
+            continue
+        i, j = (e, f) if e < f else (f, e)
+        # (0, n-1) só inverte o sentido da rota
+        if i == 0 and j == n-1:
+            continue
+        if tabu and tabu_2opt(nodes, sol, i, j, tabu):
+            continue
+        yield i, j
+
+def tabu_2opt(nodes, sol, i, j, tabu):
+    """
+    Verifica se o movimento 2-opt (i, j) cria alguma aresta tabu.
+    """
+    n = len(sol)
+    e1 = (nodes[sol[i]], nodes[sol[j]])
+    e2 = (nodes[sol[i+1]], nodes[sol[(j+1)%n]])
+    return is_tabu(tabu, e1) or is_tabu(tabu, e2)
+
+def neighborhood_oropt(graph, sol, tabu={}, maxLength=3, neighbors=None, pos=None,
+                       reverse=True):
+    """
+    Função que gera a vizinhança or-opt de forma preguiçosa. Cada vizinho é
+    descrito pelo movimento (i, l, j): o trecho sol[i..i+l-1], de 1 a
+    maxLength cidades, é reinserido entre sol[j] e sol[j+1]. Com reverse,
+    trechos de mais de uma cidade também são reinseridos invertidos, no
+    movimento (i, l, j, True). A primeira cidade da rota não é movida.
+    Movimentos que criam uma aresta tabu são ignorados.
 
     Args:
-        graph (NetworkX.Graph): Grafo do problema. Estrutura suportada pela 
-    NetworkX lib.
-        sol (list): Solução inicial, rota (lista de nós
-        a serem visitados) inicial.
+        graph (NetworkX.Graph or Instance): Grafo do problema. Estrutura
+    suportada pela NetworkX lib ou instância compilada.
+        sol (list): Solução atual em índices da instância (ver
+        DeltaEvaluator.tour).
+        tabu (TabuList or dict): arestas tabu (pares de vértices da tsplib).
+        maxLength (int): tamanho máximo do trecho movido.
+        neighbors (numpy.ndarray): lista de candidatos. Quando fornecida, só
+        são gerados movimentos que ligam uma das pontas do trecho a um de
+        seus vizinhos próximos.
+        pos (list): posição de cada cidade na rota. Calculada se não for
+        fornecida.
+        reverse (bool): gera também as reinserções invertidas.
 
     Return:
-        list: lista de vizinhos da solução fornecida.
-    """
-    neighbors = []
-    neighbor = sol.copy()
-    for i in range(0, len(sol)-3):
-        for j in range(i+2, len(sol)-(i==0)):
-            tabuOpt = False
-            neighbor = sol.copy()
-            jf = (j+1)%len(sol)
-            isNeighbor = sol[j] in graph[sol[i]] and sol[jf] in graph[sol[i+1]]
-            if isNeighbor:
-                beg = i+1
-                end = jf
-                while beg < end:
-                    neighbor[beg], neighbor[end] = neighbor[end], neighbor[beg]
-                    edge = (neighbor[beg], neighbor[end])
-                    isTabu = True if edge in tabu and tabu[edge] > 0 else False
-                    if isTabu:
-                        tabuOpt = True
-                        break
-                    beg +=1
-                    end -=1
-                if not tabuOpt:
-                    neighbors.append(neighbor)
-            
-    return neighbors
+        generator: movimentos (i, l, j) e (i, l, j, True) da vizinhança da
+        solução fornecida.
+    """
+    nodes = as_instance(graph).nodes
+    n = len(sol)
+    if neighbors is not None and pos is None:
+        pos = positions(sol)
+    for l in range(1, min(maxLength, n-2)+1):
+        for i in range(1, n-l+1):
+            first = sol[i]
+            last = sol[i+l-1]
+            for rev in ((False, True) if reverse and l > 1 else (False,)):
+                if neighbors is None:
+                    targets = range(n)
+                else:
+                    # nova aresta (sol[j], ponta) ou (outra ponta, sol[j+1])
+                    head, tail = (last, first) if rev else (first, last)
+                    targets = {pos[c] for c in neighbors[head]}
+                    targets.update((pos[c]-1) % n for c in neighbors[tail])
+                for j in targets:
+                    if i-1 <= j <= i+l-1:
+                        continue
+                    if tabu and tabu_oropt(nodes, sol, i, l, j, tabu, rev):
+                        continue
+                    yield (i, l, j, True) if rev else (i, l, j)
+
+def neighborhood_or2h(graph, sol, tabu={}, maxLength=None, neighbors=None, pos=None):
+    """
+    Vizinhança 3-opt restrita (or-2h): reinserção de trechos de qualquer
+    tamanho até maxLength, nos dois sentidos. É o caso do 3-opt em que um
+    dos três trechos é movido para outra posição, gerado de forma preguiçosa
+    e no mesmo formato do or-opt, de modo que cada movimento é avaliado em
+    O(1) por DeltaEvaluator.delta_oropt.
+
+    Args:
+        graph (NetworkX.Graph or Instance): Grafo do problema. Estrutura
+    suportada pela NetworkX lib ou instância compilada.
+        sol (list): Solução atual em índices da instância.
+        tabu (TabuList or dict): arestas tabu (pares de vértices da tsplib).
+        maxLength (int): tamanho máximo do trecho movido. Default: metade da
+        rota.
+        neighbors (numpy.ndarray): lista de candidatos. Recomendada: sem ela
+        a vizinhança tem O(n² maxLength) movimentos.
+        pos (list): posição de cada cidade na rota.
+
+    Return:
+        generator: movimentos (i, l, j) e (i, l, j, True).
+    """
+    if maxLength is None:
+        maxLength = len(sol) // 2
+    return neighborhood_oropt(graph, sol, tabu=tabu, maxLength=maxLength,
+                              neighbors=neighbors, pos=pos, reverse=True)
+
+def tabu_oropt(nodes, sol, i, l, j, tabu, reverse=False):
+    """
+    Verifica se o movimento or-opt (i, l, j) cria alguma aresta tabu.
+    """
+    n = len(sol)
+    first, last = sol[i], sol[i+l-1]
+    if reverse:
+        first, last = last, first
+    e1 = (nodes[sol[i-1]], nodes[sol[(i+l) % n]])
+    e2 = (nodes[sol[j]], nodes[first])
+    e3 = (nodes[last], nodes[sol[(j+1) % n]])
+    return is_tabu(tabu, e1) or is_tabu(tabu, e2) or is_tabu(tabu, e3)
+
+def random_move(n, kinds=('2opt',), rng=random):
+    """
+    Sorteia um movimento uniformemente entre os tipos fornecidos, no formato
+    usado por DeltaEvaluator.delta_move. A primeira cidade da rota não é
+    movida.
+
+    Args:
+        n (int): tamanho da rota (n >= 5).
+        kinds (tuple): tipos de movimento: '2opt', 'swap' e 'oropt' (trechos
+        de 1 a 3 cidades).
+        rng (random.Random): gerador de números aleatórios. Default: o
+        gerador global do módulo random.
+
+    Return:
+        (str, tuple): tipo e descrição do movimento.
+    """
+    kind = rng.choice(kinds)
+    if kind == '2opt':
+        i = rng.randrange(0, n-2)
+        # (0, n-1) só inverte o sentido da rota
+        return kind, (i, rng.randrange(i+2, n - (i == 0)))
+    if kind == 'swap':
+        p = rng.randrange(1, n-1)
+        return kind, (p, rng.randrange(p+1, n))
+    l = rng.randint(1, 3)
+    i = rng.randrange(1, n-l+1)
+    # posições fora de [i-1, i+l-1]
+    j = rng.randrange(0, n-l-1)
+    if j >= i-1:
+        j += l+1
+    return kind, (i, l, j)
@@ -0,0 +1,92 @@
+"""
+    Estruturas que guardam a matriz de feromônio da colônia de formigas.
+    Ambas são indexadas pelos índices da matriz de distâncias (Instance).
+
+    O atributo touched lista os pares (rows, cols) reforçados desde a última
+    atualização da informação de escolha da colônia; None indica que toda a
+    matriz mudou e a informação de escolha deve ser recalculada.
+"""
+import numpy as np
+
+class PheromoneMatrix:
+    """
+    Matriz de feromônio densa: a evaporação atualiza todas as arestas.
+
+    Args:
+        n (int): número de cidades.
+        rng (numpy.random.Generator): gerador usado no feromônio inicial.
+    """
+    def __init__(self, n, rng=np.random):
+        self.n = n
+        self.matrix = rng.uniform(0.01, 1, size=(n, n))
+        self.touched = None
+
+    def evaporate(self, rate):
+        self.matrix *= 1 - rate
+        self.touched = None
+
+    def reinforce(self, rows, cols, amount):
+        np.add.at(self.matrix, (rows, cols), amount)
+        if self.touched is not None:
+            self.touched.append((rows, cols))
+
+    def row(self, i, cols):
+        return self.matrix[i, cols]
+
+    def values(self):
+        return self.matrix
+
+    def relative(self):
+        """
+        Matriz proporcional ao feromônio, suficiente para as probabilidades
+        de transição.
+        """
+        return self.matrix
+
+class LazyPheromoneMatrix:
+    """
+    Matriz de feromônio com evaporação preguiçosa. O valor de uma aresta é
+    raw[i, j] * scale: evaporar multiplica somente o fator global scale e o
+    reforço divide a quantidade depositada por scale, então cada operação
+    toca apenas as arestas envolvidas. Quando scale fica muito pequeno a
+    matriz é renormalizada para evitar underflow.
+
+    Args:
+        n (int): número de cidades.
+        min_scale (float): valor de scale que dispara a renormalização.
+        rng (numpy.random.Generator): gerador usado no feromônio inicial.
+    """
+    def __init__(self, n, min_scale=1e-100, rng=np.random):
+        self.n = n
+        self.raw = rng.uniform(0.01, 1, size=(n, n))
+        self.scale = 1.0
+        self.min_scale = min_scale
+        self.touched = None
+
+    def evaporate(self, rate):
+        self.scale *= 1 - rate
+        if self.scale < self.min_scale:
+            self.normalize()
+
+    def normalize(self):
+        self.raw *= self.scale
+        self.scale = 1.0
+        self.touched = None
+
+    def reinforce(self, rows, cols, amount):
+        np.add.at(self.raw, (rows, cols), amount/self.scale)
+        if self.touched is not None:
+            self.touched.append((rows, cols))
+
+    def row(self, i, cols):
+        return self.raw[i, cols] * self.scale
+
+    def values(self):
+        return self.raw * self.scale
+
+    def relative(self):
+        """
+        Matriz proporcional ao feromônio (sem o fator global), suficiente
+        para as probabilidades de transição.
+        """
+        return self.raw
@@ -1,7 +1,8 @@
 import time
 import argparse
-import tsplib95 as tsplib
-from heuristics import SimulatedAnnealing, AntColony
+from instance import load_instance
+from heuristics import SimulatedAnnealing, ParallelTempering, AntColony
+from budget import Budget
 
 def main():
     parser = argparse.ArgumentParser(
@@ -14,7 +15,8 @@ def main():
         '-f',
         type=str,
         required=True,
-        help='Caminho até instância da tsplib.'
+        help='Caminho até instância da tsplib: arquivo .tsp, .tsp.gz ou '+
+        'membro de um arquivo tar (ex.: data/ALL_tsp.tar.gz:a280.tsp).'
     )
     parser.add_argument(
         '-k',
@@ -109,6 +111,71 @@ def main():
         help='Número das k melhores formigas no ACO a serem usadas na atualização do feromônio.'
     )
 
+    parser.add_argument(
+        '--chain-length',
+        type=int,
+        default=None,
+        required=False,
+        help='Número de movimentos aleatórios avaliados em cada temperatura. '+
+        'Default: percorre a vizinhança 2-opt completa em cada temperatura.'
+    )
+
+    parser.add_argument(
+        '--moves',
+        nargs='+',
+        choices=['2opt', 'swap', 'oropt'],
+        default=['2opt', 'swap', 'oropt'],
+        required=False,
+        help='Tipos de movimento sorteados quando --chain-length é fornecido.'
+    )
+
+    parser.add_argument(
+        '--chains',
+        type=int,
+        default=None,
+        required=False,
+        help='Número de cadeias do parallel tempering: cadeias com '+
+        'temperaturas entre --t-max e --t-min rodam em processos separados e '+
+        'trocam de estado entre temperaturas vizinhas. Default: uma cadeia '+
+        'com resfriamento.'
+    )
+
+    parser.add_argument(
+        '--rounds',
+        type=int,
+        default=100,
+        required=False,
+        help='Número de rodadas de --chain-length movimentos (seguidas de '+
+        'trocas) do parallel tempering. Default: 100.'
+    )
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        required=False,
+        help='Número de processos do parallel tempering. Default: número de cadeias.'
+    )
+
+    parser.add_argument(
+        '--time-limit',
+        type=float,
+        default=None,
+        required=False,
+        help='Tempo máximo de execução em segundos. Ao fim do prazo é '+
+        'retornada a melhor solução encontrada. Default: sem limite.'
+    )
+
+    parser.add_argument(
+        '--warm-start-share',
+        type=float,
+        default=0.3,
+        required=False,
+        help='Fração do --time-limit destinada à colônia de formigas que gera '+
+        'a solução inicial; o restante fica para o Simulated Annealing. '+
+        'Default: 0.3.'
+    )
+
     parser.add_argument(
         '--exec-data',
         '-e',
@@ -121,8 +188,8 @@ def main():
     args = parser.parse_args()
 
     start = time.time()
-    problem = tsplib.load(args.file)
-    g = problem.get_graph()
+    budget = Budget(args.time_limit)
+    g = load_instance(args.file)
 
     iter_max = 100
     iter_no_improv = 10
@@ -166,16 +233,25 @@ def main():
         Tmax = args.t_max
     Tmin = 0.2
     if args.t_min:
-        Tmax = args.t_max
+        Tmin = args.t_min
     cooling_rate = 0.01
     if args.c:
         cooling_rate = args.c
 
     h0 = AntColony(g, k, v, p, pmax, evaporation_rate, nAnts, nBest, iter_max, iter_no_improv)
-    s0, _ = h0.find_solution()
-    h = SimulatedAnnealing(g, s0, k, v, Tmax, Tmin, cooling_rate)
+    warm_limit = None
+    if budget.deadline is not None:
+        warm_limit = budget.remaining() * args.warm_start_share
+    s0, _ = h0.find_solution(warm_limit)
+    if args.chains:
+        h = ParallelTempering(g, s0, k, v, Tmax, Tmin, args.chain_length or 1000,
+                              nChains=args.chains, rounds=args.rounds,
+                              workers=args.workers, moves=tuple(args.moves))
+    else:
+        h = SimulatedAnnealing(g, s0, k, v, Tmax, Tmin, cooling_rate,
+                               chainLength=args.chain_length, moves=tuple(args.moves))
 
-    sol, cost = h.find_solution()
+    sol, cost = h.find_solution(budget.remaining())
     if args.exec_data:
         print(k, v, p, pmax, evaporation_rate, nAnts, nBest, iter_max, iter_no_improv, Tmax, Tmin, cooling_rate)
         print(str(sol).replace(' ', ''), cost, '%s' % ((time.time() - start)))
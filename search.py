@@ -1,34 +1,260 @@
-import tsplib95 as tsplib
-from evaluate import evaluate
+from evaluate import evaluate, DeltaEvaluator
+from instance import as_instance
+from twolevel import TwoLevelList
 import random
-from neighborhoods import neighborhood_2opt
+from collections import deque
+from budget import Budget
+from neighborhoods import neighborhood_2opt, neighborhood_2opt_edge, neighborhood_swap, \
+    neighborhood_oropt, neighborhood_or2h, is_tabu
 
-def best_improvement(graph, sol, candidates, k, v):
-    best = sol
-    best_cost = evaluate(graph, best, k, v)
-    for c in candidates:
-        cost = evaluate(graph, c, k, v)
-        if cost < best_cost:
-            best = c
-            best_cost = cost
-        elif cost == best_cost:
-            best = random.choice([best,c])
-            if best == c:
-                best_cost = cost
+def best_improvement(evaluator, moves, kind='2opt'):
+    """
+    Seleciona o melhor movimento usando avaliação incremental. Empates
+    são decididos aleatoriamente, inclusive com a solução atual.
+
+    Args:
+        evaluator (DeltaEvaluator): avaliador com a solução atual.
+        moves (iterable): movimentos candidatos.
+        kind (str): tipo dos movimentos ('2opt', 'swap' ou 'oropt').
+
+    Return:
+        tuple, int or float: melhor movimento (None se a solução atual é
+        mantida) e variação de custo.
+    """
+    delta_move = getattr(evaluator, 'delta_' + kind)
+    best = None
+    best_delta = 0
+    for move in moves:
+        delta = delta_move(*move)
+        if delta < best_delta:
+            best = move
+            best_delta = delta
+        elif delta == best_delta:
+            best = random.choice([best,move])
+
+    return best, best_delta
+
+def first_improvement(graph, evaluator, iter_max, tabu={}, neighbors=None, budget=None):
+    """
+    Descida por primeira melhora na vizinhança 2-opt com don't-look bits.
+    Cada cidade ativa tem suas duas arestas testadas; o primeiro movimento de
+    melhora é aplicado e as cidades das arestas alteradas são reativadas.
+    Uma cidade sem movimento de melhora é desativada até que uma de suas
+    arestas mude.
+
+    Args:
+        graph (NetworkX.Graph or Instance): Grafo do problema. Estrutura
+    suportada pela NetworkX lib ou instância compilada.
+        evaluator (DeltaEvaluator): avaliador com a solução atual. A solução
+        é modificada no próprio objeto.
+        iter_max (int): número máximo de movimentos aplicados.
+        tabu (TabuList or dict): arestas tabu (pares de vértices da tsplib).
+        neighbors (numpy.ndarray): lista de candidatos que restringe a
+        vizinhança (ver Instance.nearest_neighbors).
+        budget (Budget): limite de tempo e notificação de novas soluções.
 
-    sol_cost = evaluate(graph, sol, k, v)
-    if sol_cost < best_cost:
-        return None, 0
+    Return:
+        int: número de movimentos aplicados.
+    """
+    if budget is None:
+        budget = Budget()
+    ev = evaluator
+    t = ev.tour
+    n = ev.n
+    active = deque(t)
+    isActive = [False] * len(ev.pos)
+    for c in t:
+        isActive[c] = True
+
+    it = 0
+    while active and it < iter_max and not budget.expired():
+        c = active.popleft()
+        isActive[c] = False
+        p = ev.pos[c]
+        for e in (p, (p-1) % n):
+            move = None
+            for m in neighborhood_2opt_edge(graph, t, e, tabu=tabu,
+                                            neighbors=neighbors, pos=ev.pos):
+                delta = ev.delta_2opt(*m)
+                if delta < 0:
+                    move = m
+                    break
+            if move is not None:
+                i, j = move
+                changed = (t[i], t[i+1], t[j], t[(j+1) % n])
+                ev.apply_2opt(i, j, delta)
+                budget.incumbent(ev.solution, ev.cost)
+                it += 1
+                for city in changed:
+                    if not isActive[city]:
+                        isActive[city] = True
+                        active.append(city)
+                break
+    return it
 
-    return best, best_cost
+# vizinhanças usadas pela descida em vizinhança variável e o tipo dos seus
+# movimentos no DeltaEvaluator
+NEIGHBORHOODS = {
+    'swap': (neighborhood_swap, 'swap'),
+    '2opt': (neighborhood_2opt, '2opt'),
+    'oropt': (neighborhood_oropt, 'oropt'),
+    'or2h': (neighborhood_or2h, 'oropt'),
+}
 
-def local_search(graph, s0, k, v, iter_max, iter_no_improve_max, tabu={}):
+def vnd(graph, evaluator, iter_max, kinds=('swap', '2opt', 'oropt'), tabu={},
+        neighbors=None, budget=None):
+    """
+    Descida em vizinhança variável (VND). Aplica o melhor movimento de
+    melhora da vizinhança atual; quando ela não tem movimento de melhora
+    passa para a próxima, e após cada melhora volta para a primeira. Termina
+    quando nenhuma vizinhança melhora a solução.
+
+    Args:
+        graph (NetworkX.Graph or Instance): Grafo do problema. Estrutura
+    suportada pela NetworkX lib ou instância compilada.
+        evaluator (DeltaEvaluator): avaliador com a solução atual. A solução
+        é modificada no próprio objeto.
+        iter_max (int): número máximo de movimentos aplicados.
+        kinds (tuple): vizinhanças, na ordem em que são exploradas: 'swap',
+        '2opt', 'oropt' e 'or2h' (ver NEIGHBORHOODS).
+        tabu (TabuList or dict): arestas tabu (pares de vértices da tsplib).
+        neighbors (numpy.ndarray): lista de candidatos que restringe as
+        vizinhanças (ver Instance.nearest_neighbors).
+        budget (Budget): limite de tempo e notificação de novas soluções.
+
+    Return:
+        int: número de movimentos aplicados.
+    """
+    if budget is None:
+        budget = Budget()
+    ev = evaluator
+    it = 0
+    current = 0
+    while current < len(kinds) and it < iter_max and not budget.expired():
+        neighborhood, kind = NEIGHBORHOODS[kinds[current]]
+        moves = neighborhood(graph, ev.tour, tabu=tabu, neighbors=neighbors, pos=ev.pos)
+        move, delta = best_improvement(ev, moves, kind)
+        if move is None or delta >= 0:
+            current += 1
+            continue
+
+        ev.apply_move(kind, move, delta)
+        budget.incumbent(ev.solution, ev.cost)
+        it += 1
+        current = 0
+    return it
+
+def two_level_search(graph, s0, k, v, iter_max, neighbors, tabu={}, budget=None):
+    """
+    Descida por primeira melhora na vizinhança 2-opt restrita à lista de
+    candidatos, com don't-look bits, sobre uma rota em lista de dois níveis
+    (TwoLevelList): cada movimento custa O(sqrt n) em vez de O(n), o que
+    viabiliza instâncias com dezenas de milhares de cidades. A primeira
+    cidade de s0 é mantida no início da rota e o sentido da rota é
+    preservado, como nos movimentos sobre vetores: de cada movimento é
+    invertido o caminho que não contém a primeira cidade. Não usa a matriz
+    de distâncias, de forma que a instância pode ser carregada sem ela
+    (load_instance com dense=False).
+
+    Args:
+        graph (NetworkX.Graph or Instance): Grafo do problema. Estrutura
+    suportada pela NetworkX lib ou instância compilada.
+        s0 (list): Solução inicial (rota).
+        k (int): Número de entregas no TSPd
+        v (int): Valor das entregas no TSPd.
+        iter_max (int): número máximo de movimentos aplicados.
+        neighbors (numpy.ndarray): lista de candidatos (ver
+        Instance.nearest_neighbors).
+        tabu (TabuList or dict): arestas tabu (pares de vértices da tsplib).
+        budget (Budget): limite de tempo e notificação de novas soluções.
+
+    Return:
+        list, float: solução encontrada e seu custo.
+    """
+    if budget is None:
+        budget = Budget()
+    inst = as_instance(graph)
+    # instâncias grandes podem ter sido carregadas sem a matriz de distâncias
+    # (ver load_instance); d calcula as distâncias sob demanda
+    d = inst.distance_function()
+    nodes = inst.nodes
+    cities = inst.indices(s0).tolist()
+    start = cities[0]
+    tour = TwoLevelList(cities, inst.n)
+    cost = evaluate(inst, s0, k, v)
+    pairs = [(i*2-1, i*2) for i in range(1, k+1)] if v != 0 else []
+
+    def orient(a, b, c, e):
+        # movimento equivalente que inverte o caminho sem a primeira cidade
+        if tour.between(b, start, c):
+            return c, e, a, b
+        return a, b, c, e
+
+    def delta(a, b, c, e):
+        dl = d(a, c) + d(b, e) - d(a, b) - d(c, e)
+        if pairs:
+            _, first, last, _ = orient(a, b, c, e)
+            for pickup, delivery in pairs:
+                if tour.between(first, pickup, last) and tour.between(first, delivery, last):
+                    dl += v if tour.between(start, pickup, delivery) else -v
+        return dl
+
+    def solution():
+        return inst.route(tour.tolist(start))
+
+    active = deque(cities)
+    isActive = [False] * inst.n
+    for c in cities:
+        isActive[c] = True
+
+    it = 0
+    while active and it < iter_max and not budget.expired():
+        c = active.popleft()
+        isActive[c] = False
+        move = None
+        for succ in (True, False):
+            for x in neighbors[c].tolist():
+                if succ:
+                    # nova aresta (c, x)
+                    m = (c, tour.next(c), x, tour.next(x))
+                else:
+                    # nova aresta (x, c)
+                    m = (tour.prev(x), x, tour.prev(c), c)
+                if len(set(m)) < 4:
+                    continue
+                if tabu and (is_tabu(tabu, (nodes[m[0]], nodes[m[2]])) or
+                             is_tabu(tabu, (nodes[m[1]], nodes[m[3]]))):
+                    continue
+                dl = delta(*m)
+                if dl < 0:
+                    move = m
+                    break
+            if move is not None:
+                break
+
+        if move is not None:
+            tour.two_opt_move(*orient(*move))
+            cost += dl
+            budget.incumbent(solution, cost)
+            it += 1
+            for city in move:
+                if not isActive[city]:
+                    isActive[city] = True
+                    active.append(city)
+            if not isActive[c]:
+                isActive[c] = True
+                active.append(c)
+    return solution(), cost
+
+def local_search(graph, s0, k, v, iter_max, iter_no_improve_max, tabu={},
+                 strategy='best', neighbors=None, time_limit=None, callback=None,
+                 kinds=('swap', '2opt', 'oropt'), tour='array'):
     """
     Função que calcula solução (rota) utilizando busca local com vizinhança
-    2-opt. 
+    2-opt. Os vizinhos são avaliados de forma incremental (DeltaEvaluator).
     Args:
-        graph (NetworkX.Graph): Grafo do problema. Estrutura suportada pela 
-    NetworkX lib.
+        graph (NetworkX.Graph or Instance): Grafo do problema. Estrutura
+    suportada pela NetworkX lib ou instância compilada.
         s0 (list): Solução inicial para busca local, rota (lista de nós
         a serem visitados) inicial.
         k (int): Número de entregas no TSPd
@@ -36,6 +262,23 @@ def local_search(graph, s0, k, v, iter_max, iter_no_improve_max, tabu={}):
         iter_max (int): Valor máximo de iterações da busca local.
         iter_no_improve_max (int): Valor máximo de iterações sem melhora da
         busca local.
+        tabu (TabuList or dict): arestas tabu (pares de vértices da tsplib).
+        strategy (str): 'best' para melhor melhora, 'first' para primeira
+        melhora com don't-look bits ou 'vnd' para a descida em vizinhança
+        variável com swap, 2-opt e or-opt. Em 'first' e 'vnd' cada movimento
+        aplicado conta como uma iteração e iter_no_improve_max é ignorado.
+        neighbors (numpy.ndarray): lista de candidatos que restringe a
+        vizinhança 2-opt (ver Instance.nearest_neighbors).
+        time_limit (float): tempo máximo de execução em segundos. Ao fim do
+        prazo é retornada a melhor solução encontrada até então.
+        callback (function): chamada como callback(solução, custo, tempo) a
+        cada melhora da solução.
+        kinds (tuple): vizinhanças da estratégia 'vnd' (ver vnd).
+        tour (str): representação da rota: 'array' (vetor) ou '2level' (lista
+        de dois níveis, ver two_level_search), indicada para instâncias
+        grandes, que pode ser usada com instâncias carregadas sem a matriz de
+        distâncias. '2level' usa sempre a primeira melhora 2-opt com lista de
+        candidatos (10 vizinhos se neighbors não for fornecida).
 
     Return:
         list, float: Solução encontrada pela busca local(rota com as cidades que devem
@@ -43,20 +286,35 @@ def local_search(graph, s0, k, v, iter_max, iter_no_improve_max, tabu={}):
     """
     it = 0
     it_no_improve = 0
-    s = s0.copy()
-    s_cost = evaluate(graph, s, k, v)
+    budget = Budget(time_limit, callback)
+    if tour == '2level':
+        if neighbors is None:
+            neighbors = as_instance(graph).nearest_neighbors(10)
+        return two_level_search(graph, s0, k, v, iter_max, neighbors, tabu=tabu, budget=budget)
+
+    ev = DeltaEvaluator(graph, s0, k, v)
+
+    if strategy == 'first':
+        first_improvement(graph, ev, iter_max, tabu=tabu, neighbors=neighbors, budget=budget)
+        return ev.solution(), ev.cost
+    if strategy == 'vnd':
+        vnd(graph, ev, iter_max, kinds=kinds, tabu=tabu, neighbors=neighbors, budget=budget)
+        return ev.solution(), ev.cost
 
-    while it < iter_max and it_no_improve < iter_no_improve_max:
-        candidates = neighborhood_2opt(graph, s, tabu=tabu)
-        s1, s1_cost = best_improvement(graph, s, candidates, k, v)
+    while it < iter_max and it_no_improve < iter_no_improve_max and not budget.expired():
+        moves = neighborhood_2opt(graph, ev.tour, tabu=tabu, neighbors=neighbors, pos=ev.pos)
+        move, delta = best_improvement(ev, moves)
 
-        if s1 == None:
+        # solução atual é um ótimo local
+        if move == None:
             break
 
-        improv_rate = abs(s1_cost/s_cost - 1)
-        s = s1
-        s_cost = s1_cost
+        s_cost = ev.cost
+        ev.apply_2opt(*move, delta)
+        if delta < 0:
+            budget.incumbent(ev.solution, ev.cost)
+        improv_rate = abs(ev.cost/s_cost - 1)
         if improv_rate < 0.01:
             it_no_improve += 1
         it += 1
-    return s, s_cost
+    return ev.solution(), ev.cost
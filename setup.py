@@ -26,3 +26,33 @@ setup(
     ext_modules=cythonize('evaluate.py', language_level="3")
 )
 
+
+setup(
+    name='Compiled instance',
+    ext_modules=cythonize('instance.py', language_level="3")
+)
+
+setup(
+    name='Pheromone storage',
+    ext_modules=cythonize('pheromone.py', language_level="3")
+)
+
+setup(
+    name='Tabu list',
+    ext_modules=cythonize('tabu.py', language_level="3")
+)
+
+setup(
+    name='Compact tour',
+    ext_modules=cythonize('tour.py', language_level="3")
+)
+
+setup(
+    name='Two-level list tour',
+    ext_modules=cythonize('twolevel.py', language_level="3")
+)
+
+setup(
+    name='TSPLIB reader',
+    ext_modules=cythonize('tsp_reader.py', language_level="3")
+)
@@ -1,71 +1,76 @@
 import random
+import numpy as np
+from instance import as_instance
 """
     Functions related to the solution of the TSDp problem, e.g. finding
     a initial solution, adding noise to an existing solution, etc.
 """
+def nearest(row, visited):
+    """
+    Índice do vértice não visitado mais próximo. Em caso de empate retorna o
+    primeiro vértice na ordem da instância.
+
+    Args:
+        row (numpy.ndarray): distâncias do vértice atual a todos os vértices
+        (linha da matriz de distâncias, ver Instance.distances).
+        visited (numpy.ndarray): máscara dos vértices já visitados.
+
+    Return:
+        int: índice do vizinho mais próximo.
+    """
+    d = row.astype(np.float64)
+    d[visited] = np.inf
+    return int(np.argmin(d))
+
 def nearest_neighbor2(graph, start_node = 0):
     """
     Função que calcula solução (rota) inicial do TSPd usando heurística do
     vizinho mais próximo. Esta versão adiciona cidades no inicio e final da rota.
 
     Args:
-        graph (NetworkX.Graph): Grafo do problema. Estrutura suportada pela 
-    NetworkX lib.
+        graph (NetworkX.Graph or Instance): Grafo do problema. Estrutura
+    suportada pela NetworkX lib ou instância compilada.
         start_node (int): Vértice de inicio, valor default é o vértice 0.
 
     Return:
         list: rota com as cidades que devem ser visitadas
     """
     s = []
-    g = graph
-    nodes = list(g.nodes)
+    inst = as_instance(graph)
+    index = inst.index
+    nodes = inst.nodes
     s.append(nodes[start_node])
-    visited = {
-        nodes[0]: True }
-    while len(visited) != len(nodes):
+    visited = np.zeros(inst.n, dtype=bool)
+    visited[0] = True
+    nVisited = 1
+    while nVisited != len(nodes):
         beg = s[0]
-        i = s[len(s)-1]
-        j = None
-        k = None
-
-        # seleciona primeiro visinho
-        for neighbor in g[i]:
-            if neighbor not in visited:
-                j = neighbor
-                break
+        i = index[s[len(s)-1]]
+        first = index[s[0]]
 
-        for neighbor in g[beg]:
-            if neighbor not in visited:
-                k = neighbor
-                break
+        # encontra o vizinho mais próximo do final e do início da rota
+        j = nearest(inst.distances(i), visited)
+        k = nearest(inst.distances(first), visited)
+        dj = inst.distances(i, j)
+        dk = inst.distances(k, first)
 
-        # encontra o vizinho mais próximo
-        for neighbor in g[i]:
-            if neighbor not in visited:
-                if g[i][neighbor]['weight'] < g[i][j]['weight']:
-                    j = neighbor
-
-        for neighbor in g[s[0]]:
-            if neighbor not in visited:
-                if g[neighbor][s[0]]['weight'] < g[k][s[0]]['weight']:
-                    k = neighbor
-            
-        if g[i][j]['weight'] < g[k][s[0]]['weight']:
+        if dj < dk:
             visited[j] = True
             # adiciona o vizinho mais próximo na solução
-            s.append(j)
-        elif g[k][s[0]]['weight'] < g[i][j]['weight']:
+            s.append(nodes[j])
+        elif dk < dj:
             visited[k] = True
-            s.insert(0,k)
+            s.insert(0,nodes[k])
             beg += 1
         else:
             r = random.choice([j,k])
             if r == j:
-                s.append(r)
+                s.append(nodes[r])
             else:
-                s.insert(0,r)
+                s.insert(0,nodes[r])
                 beg += 1
             visited[r] = True
+        nVisited += 1
 
         for i in range(0,beg):
             c = s.pop(0)
@@ -79,38 +84,26 @@ def nearest_neighbor1(graph, start_node = 0):
     o final da rota.
 
     Args:
-        graph (NetworkX.Graph): Grafo do problema. Estrutura suportada pela 
-    NetworkX lib.
+        graph (NetworkX.Graph or Instance): Grafo do problema. Estrutura
+    suportada pela NetworkX lib ou instância compilada.
         start_node (int): Vértice de inicio, valor default é o vértice 0.
 
     Return:
         list: rota com as cidades que devem ser visitadas
     """
-    s = []
-    g = graph
-    nodes = list(g.nodes)
-    s.append(nodes[start_node])
-    visited = {
-        nodes[0]: True
-    }
-    while len(visited) != len(nodes):
+    inst = as_instance(graph)
+    s = [start_node]
+    visited = np.zeros(inst.n, dtype=bool)
+    visited[0] = True
+    nVisited = 1
+    while nVisited != inst.n:
         i = s[len(s)-1]
-        j = None
-
-        # seleciona primeiro visinho
-        for neighbor in g[i]:
-            if neighbor not in visited:
-                j = neighbor
-                break
 
         # encontra o vizinho mais próximo
-        for neighbor in g[i]:
-            if neighbor not in visited:
-                if g[i][neighbor]['weight'] < g[i][j]['weight']:
-                    j = neighbor
-        
+        j = nearest(inst.distances(i), visited)
+
         visited[j] = True
+        nVisited += 1
         # adiciona o vizinho mais próximo na solução
         s.append(j)
-    return s
-
+    return inst.route(s)
@@ -0,0 +1,71 @@
+"""
+    Lista tabu com marcas de expiração, usada pela busca local, pelo GRASP e
+    pela colônia de formigas.
+"""
+
+class TabuList:
+    """
+    Lista tabu em que cada atributo (aresta, cidade, movimento...) guarda a
+    iteração em que deixa de ser tabu. Consultar um atributo é O(1) e
+    envelhecer a lista (step) apenas avança o contador de iterações, sem
+    percorrer as entradas. Entradas expiradas são descartadas em lote quando
+    o dicionário dobra de tamanho, mantendo o custo amortizado O(1).
+
+    Compatível com o dicionário atributo -> iterações restantes usado antes:
+    `attr in tabu` indica se o atributo está ativo e tabu[attr] retorna o
+    número de iterações restantes (0 se não for tabu).
+    """
+    def __init__(self):
+        self.iteration = 0
+        self.expiry = {}
+        # maior marca registrada: a lista tem algum atributo ativo se e somente
+        # se ela ainda não expirou
+        self.latest = 0
+        self.purgeSize = 64
+
+    def add(self, attr, tenure):
+        """
+        Torna attr tabu pelas próximas tenure iterações.
+        """
+        expiry = self.iteration + tenure
+        self.expiry[attr] = expiry
+        if expiry > self.latest:
+            self.latest = expiry
+
+    def step(self):
+        """
+        Avança uma iteração, envelhecendo todas as entradas.
+        """
+        self.iteration += 1
+        if len(self.expiry) > self.purgeSize:
+            it = self.iteration
+            self.expiry = { a: e for a, e in self.expiry.items() if e > it }
+            self.purgeSize = max(64, 2*len(self.expiry))
+
+    def is_tabu(self, attr):
+        return self.expiry.get(attr, 0) > self.iteration
+
+    def remaining(self, attr):
+        """
+        Número de iterações até attr deixar de ser tabu.
+        """
+        return max(self.expiry.get(attr, 0) - self.iteration, 0)
+
+    def items(self):
+        """
+        Pares (atributo, iterações restantes) dos atributos ativos.
+        """
+        it = self.iteration
+        return [(a, e - it) for a, e in self.expiry.items() if e > it]
+
+    def __contains__(self, attr):
+        return self.is_tabu(attr)
+
+    def __getitem__(self, attr):
+        return self.remaining(attr)
+
+    def __bool__(self):
+        return self.latest > self.iteration
+
+    def __len__(self):
+        return len(self.items())
@@ -0,0 +1,102 @@
+import time
+import argparse
+from instance import load_instance
+from heuristics import TabuSearch
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Programa lê uma instância da tsplib '+
+        ', gera uma solução inicial utilizando a heurística do vizinho mais '+
+        'próximo e otimiza esta solução utilizando busca tabu.'
+    )
+    parser.add_argument(
+        '--file',
+        '-f',
+        type=str,
+        required=True,
+        help='Caminho até instância da tsplib: arquivo .tsp, .tsp.gz ou '+
+        'membro de um arquivo tar (ex.: data/ALL_tsp.tar.gz:a280.tsp).'
+    )
+    parser.add_argument(
+        '-k',
+        type=int,
+        default=0,
+        required=True,
+        help='Número de entregas do Tspd.'
+    )
+
+    parser.add_argument(
+        '-v',
+        type=int,
+        default=0,
+        required=True,
+        help='Valor de cada entrega do Tspd.'
+    )
+
+    parser.add_argument(
+        '-i',
+        type=int,
+        default=1000,
+        required=True,
+        help='Valor máximo de iterações da busca tabu.'
+    )
+
+    parser.add_argument(
+        '-n',
+        type=int,
+        default=100,
+        required=False,
+        help='Número máximo de iterações sem melhora. Default: 100.'
+    )
+
+    parser.add_argument(
+        '--tenure',
+        type=int,
+        default=10,
+        required=False,
+        help='Número de iterações em que uma aresta removida permanece tabu. Default: 10.'
+    )
+
+    parser.add_argument(
+        '--neighbors',
+        type=int,
+        default=10,
+        required=False,
+        help='Tamanho da lista de candidatos (vizinhos mais próximos de cada '+
+        'cidade). 0 para a vizinhança 2-opt completa. Default: 10.'
+    )
+
+    parser.add_argument(
+        '--time-limit',
+        type=float,
+        default=None,
+        required=False,
+        help='Tempo máximo de execução em segundos. Ao fim do prazo é '+
+        'retornada a melhor solução encontrada. Default: sem limite.'
+    )
+
+    parser.add_argument(
+        '--exec-data',
+        '-e',
+        action='store_true',
+        required=False,
+        help='Imprime dados de execução como os parâmetros de execução: k, v, solução, custo e tempo de execução',
+        default=False
+    )
+
+    args = parser.parse_args()
+
+    start = time.time()
+    g = load_instance(args.file)
+
+    heuristic = TabuSearch(g, args.k, args.v, tenure=args.tenure, iterMax=args.i,
+                           iterNoImproveMax=args.n, nNeighbors=args.neighbors)
+    sol, cost = heuristic.find_solution(args.time_limit)
+    if args.exec_data:
+        print(args.k, args.v, args.i, args.n, args.tenure)
+        print(str(sol).replace(' ', ''), cost, '%s' % ((time.time() - start)))
+    else:
+        print(sol, cost)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+    Representação compacta de rotas: vetor de cidades (índices da instância)
+    com o vetor inverso de posições.
+"""
+from array import array
+
+class Tour(array):
+    """
+    Rota armazenada em um array('i') (4 bytes por cidade) junto com a
+    posição de cada cidade, mantida a cada modificação. Consultar a posição,
+    a cidade seguinte ou a anterior é O(1); inverter um trecho ou mover um
+    trecho é proporcional ao trecho alterado.
+
+    Como é um array, pode ser usada no lugar de uma lista de cidades
+    (indexação, len, iteração) sem custo adicional de acesso. As modificações
+    devem ser feitas pelos métodos abaixo, que atualizam as posições.
+
+    Args:
+        cities (iterable): cidades da rota, em índices da instância.
+        size (int): número de cidades da instância (tamanho do vetor de
+        posições). Default: maior cidade da rota + 1.
+    """
+    def __new__(cls, cities, size=None):
+        tour = super().__new__(cls, 'i', cities)
+        if size is None:
+            size = max(tour) + 1
+        tour.positions = array('i', [0]) * size
+        for p, c in enumerate(tour):
+            tour.positions[c] = p
+        return tour
+
+    def __repr__(self):
+        return 'Tour(%s)' % self.tolist()
+
+    def copy(self):
+        # copia os dois vetores diretamente, sem recalcular as posições
+        tour = array.__new__(Tour, 'i', self)
+        tour.positions = array('i', self.positions)
+        return tour
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def __reduce__(self):
+        return Tour, (self.tolist(), len(self.positions))
+
+    def pos(self, city):
+        """
+        Posição da cidade na rota.
+        """
+        return self.positions[city]
+
+    def next(self, city):
+        """
+        Cidade seguinte na rota (a rota é circular).
+        """
+        p = self.positions[city] + 1
+        return self[p if p < len(self) else 0]
+
+    def prev(self, city):
+        """
+        Cidade anterior na rota (a rota é circular).
+        """
+        return self[self.positions[city] - 1]
+
+    def reverse_segment(self, i, j):
+        """
+        Inverte o trecho da rota entre as posições i e j (inclusive).
+        """
+        positions = self.positions
+        self[i:j+1] = self[i:j+1][::-1]
+        for p in range(i, j+1):
+            positions[self[p]] = p
+
+    def swap(self, p, q):
+        """
+        Troca as cidades das posições p e q.
+        """
+        self[p], self[q] = self[q], self[p]
+        self.positions[self[p]] = p
+        self.positions[self[q]] = q
+
+    def move(self, i, l, j, reverse=False):
+        """
+        Move o trecho da rota entre as posições i e i+l-1 para entre as
+        posições j e j+1, invertido se reverse (movimento or-opt).
+        """
+        segment = self[i:i+l]
+        if reverse:
+            segment.reverse()
+        del self[i:i+l]
+        p = j - l + 1 if j > i else j + 1
+        self[p:p] = segment
+        lo, hi = (i, j) if j > i else (j + 1, i + l - 1)
+        positions = self.positions
+        for p in range(lo, hi+1):
+            positions[self[p]] = p
@@ -0,0 +1,352 @@
+"""
+    Leitor de instâncias da tsplib que lê o arquivo linha a linha e escreve
+    diretamente em vetores da NumPy, sem passar pela tsplib95 nem pela
+    NetworkX. Suporta NODE_COORD_SECTION com distâncias EUC_2D, CEIL_2D, ATT
+    e GEO, e EDGE_WEIGHT_SECTION (EXPLICIT) nos formatos de matriz completa e
+    triangular. Os arredondamentos seguem os da tsplib95, de forma que os
+    custos são idênticos aos obtidos por ela.
+"""
+import math
+import numpy as np
+import archive
+
+# raio da Terra usado pela tsplib nas distâncias GEO
+RADIUS = 6378.388
+
+# número de linhas da matriz calculadas por vez, limitando o tamanho dos
+# vetores temporários em instâncias grandes
+BLOCK = 256
+
+COORD_TYPES = ('EUC_2D', 'CEIL_2D', 'ATT', 'GEO')
+
+class Unsupported(ValueError):
+    """
+    Instância em um formato que o leitor não suporta (tipo de distância,
+    formato de matriz ou vértices repetidos). Quem chama pode recorrer à
+    tsplib95.
+    """
+
+def read(lines, dense=True):
+    """
+    Lê uma instância da tsplib.
+
+    Args:
+        lines (iterable): linhas do arquivo (arquivo aberto em modo texto).
+        dense (bool): calcula a matriz de distâncias. Quando False, instâncias
+        com coordenadas são retornadas sem a matriz (dist None) e as
+        distâncias são calculadas sob demanda (ver Instance.distances).
+
+    Return:
+        dict: argumentos de Instance (nodes, dist, coords, name,
+        edge_weight_type).
+
+    Raises:
+        Unsupported: tipo de distância ou formato de matriz não suportado.
+        ValueError: arquivo mal formado.
+    """
+    specs = {}
+    coords = ids = display = weights = None
+    lines = iter(lines)
+    line = next(lines, None)
+    while line is not None:
+        line = line.strip()
+        if not line:
+            line = next(lines, None)
+            continue
+        key, _, value = line.partition(':')
+        key = key.strip()
+        value = value.strip()
+        if key == 'EOF':
+            break
+
+        if key == 'NODE_COORD_SECTION':
+            ids, coords, line = read_coords(lines, dimension(specs))
+        elif key == 'DISPLAY_DATA_SECTION':
+            display, _, line = read_coords(lines, dimension(specs))
+        elif key == 'EDGE_WEIGHT_SECTION':
+            weights, line = read_numbers(lines, weight_count(specs))
+        elif key.endswith('_SECTION'):
+            # seções que não afetam as distâncias (DEPOT, DEMAND, TOUR...)
+            line = skip_section(lines)
+        else:
+            specs[key] = value
+            line = next(lines, None)
+
+    kind = specs.get('EDGE_WEIGHT_TYPE')
+    n = dimension(specs)
+
+    # vértices na mesma ordem da tsplib95: coordenadas, dados de exibição ou
+    # 0..n-1, nesta prioridade
+    if ids is not None:
+        order = np.argsort(ids, kind='stable')
+        ids = ids[order]
+        coords = coords[order]
+        nodes = ids
+    elif display is not None:
+        nodes = np.sort(display)
+    else:
+        nodes = np.arange(n, dtype=np.int64)
+    if len(np.unique(nodes)) != len(nodes):
+        raise Unsupported('vértices repetidos')
+
+    if kind == 'EXPLICIT':
+        if weights is None:
+            raise ValueError('EDGE_WEIGHT_SECTION ausente')
+        full = explicit_matrix(weights, n, specs.get('EDGE_WEIGHT_FORMAT'))
+        index = nodes - nodes.min()
+        if len(index) != n or np.any(index != np.arange(n)):
+            full = full[np.ix_(index, index)]
+        dist = full
+    elif kind in COORD_TYPES:
+        if coords is None:
+            raise ValueError('NODE_COORD_SECTION ausente')
+        dist = coord_matrix(coords, kind) if dense else None
+    else:
+        raise Unsupported('EDGE_WEIGHT_TYPE %s não suportado' % kind)
+
+    return {
+        'nodes': nodes.tolist(),
+        'dist': dist,
+        'coords': coords,
+        'name': specs.get('NAME'),
+        'edge_weight_type': kind,
+    }
+
+def load(path, dense=True):
+    """
+    Lê a instância da tsplib no caminho path (ver read), que pode estar
+    compactada (ver archive.py).
+    """
+    with archive.open_text(path) as f:
+        return read(f, dense)
+
+def dimension(specs):
+    try:
+        return int(specs['DIMENSION'])
+    except (KeyError, ValueError):
+        raise ValueError('DIMENSION ausente ou inválida')
+
+def weight_count(specs):
+    """
+    Quantidade de números da EDGE_WEIGHT_SECTION segundo o formato.
+    """
+    n = dimension(specs)
+    fmt = specs.get('EDGE_WEIGHT_FORMAT')
+    if fmt == 'FULL_MATRIX':
+        return n*n
+    if fmt in ('UPPER_ROW', 'LOWER_ROW', 'UPPER_COL', 'LOWER_COL'):
+        return n*(n-1) // 2
+    if fmt in ('UPPER_DIAG_ROW', 'LOWER_DIAG_ROW', 'UPPER_DIAG_COL', 'LOWER_DIAG_COL'):
+        return n*(n+1) // 2
+    raise Unsupported('EDGE_WEIGHT_FORMAT %s não suportado' % fmt)
+
+def is_data(line):
+    """
+    Linhas de dados de uma seção começam por um número; a seção termina na
+    primeira linha que começa por uma palavra-chave.
+    """
+    return not line[:1].isalpha()
+
+def skip_section(lines):
+    for line in lines:
+        if line.strip() and not is_data(line.strip()):
+            return line
+    return None
+
+def read_coords(lines, n):
+    """
+    Lê uma seção de coordenadas (índice x y) para vetores pré-alocados.
+
+    Return:
+        tuple: índices dos vértices, coordenadas (n x 2) e a primeira linha
+        após a seção.
+    """
+    ids = np.empty(n, dtype=np.int64)
+    coords = np.empty((n, 2), dtype=np.float64)
+    k = 0
+    line = None
+    for line in lines:
+        parts = line.split()
+        if not parts:
+            continue
+        if not is_data(parts[0]):
+            break
+        if k == n or len(parts) != 3:
+            raise ValueError('linha de coordenadas inválida: %s' % line.strip())
+        ids[k] = int(parts[0])
+        coords[k, 0] = float(parts[1])
+        coords[k, 1] = float(parts[2])
+        k += 1
+    else:
+        line = None
+    if k != n:
+        raise ValueError('esperadas %d coordenadas, lidas %d' % (n, k))
+    return ids, coords, line
+
+def read_numbers(lines, count):
+    """
+    Lê os count primeiros números de uma seção para um vetor pré-alocado.
+    Números além de count são ignorados, como na tsplib95.
+
+    Return:
+        tuple: números lidos e a primeira linha após a seção.
+    """
+    numbers = np.empty(count, dtype=np.float64)
+    k = 0
+    line = None
+    for line in lines:
+        parts = line.split()
+        if not parts:
+            continue
+        if not is_data(parts[0]):
+            break
+        m = min(len(parts), count - k)
+        numbers[k:k+m] = [float(x) for x in parts[:m]]
+        k += m
+    else:
+        line = None
+    if k != count:
+        raise ValueError('esperados %d pesos, lidos %d' % (count, k))
+    return numbers, line
+
+def explicit_matrix(weights, n, fmt):
+    """
+    Monta a matriz n x n a partir dos pesos da EDGE_WEIGHT_SECTION.
+    """
+    weights = weights.astype(np.int64)
+    if fmt == 'FULL_MATRIX':
+        return weights.reshape(n, n)
+
+    # os formatos por coluna equivalem aos formatos por linha do triângulo
+    # oposto
+    if fmt in ('UPPER_DIAG_ROW', 'LOWER_DIAG_COL'):
+        rows, cols = np.triu_indices(n, 0)
+    elif fmt in ('UPPER_ROW', 'LOWER_COL'):
+        rows, cols = np.triu_indices(n, 1)
+    elif fmt in ('LOWER_DIAG_ROW', 'UPPER_DIAG_COL'):
+        rows, cols = np.tril_indices(n, 0)
+    else:
+        rows, cols = np.tril_indices(n, -1)
+    dist = np.zeros((n, n), dtype=np.int64)
+    dist[rows, cols] = weights
+    dist[cols, rows] = weights
+    return dist
+
+def coord_matrix(coords, kind):
+    """
+    Calcula a matriz de distâncias entre as coordenadas, em blocos de
+    linhas escritos diretamente na matriz final.
+    """
+    n = len(coords)
+    dist = np.empty((n, n), dtype=np.int64)
+    every = np.arange(n)
+    for a in range(0, n, BLOCK):
+        b = min(a + BLOCK, n)
+        coord_distances(coords, kind, every[a:b, None], every[None, :], dist[a:b])
+    return dist
+
+def coord_distances(coords, kind, rows, cols, out=None):
+    """
+    Distâncias entre os vértices de índices rows e cols, calculadas a partir
+    das coordenadas. rows e cols são combinados por broadcasting da NumPy:
+    vetores de mesmo tamanho dão as distâncias par a par, um vetor coluna e
+    um vetor linha dão um bloco da matriz.
+
+    Args:
+        out (numpy.ndarray): vetor (int64) onde as distâncias são escritas.
+
+    Return:
+        numpy.ndarray: distâncias (int64).
+    """
+    if kind == 'GEO':
+        dist = geo_distances(coords[rows], coords[cols])
+    else:
+        dist = euclidean_distances(coords, kind, rows, cols)
+    if out is None:
+        return dist.astype(np.int64)
+    out[...] = dist
+    return out
+
+def euclidean_distances(coords, kind, rows, cols):
+    x = coords[:, 0]
+    y = coords[:, 1]
+    dx = x[rows] - x[cols]
+    dy = y[rows] - y[cols]
+    square = dx*dx + dy*dy
+    if kind == 'EUC_2D':
+        dist = np.floor(np.sqrt(square) + 0.5)
+    elif kind == 'CEIL_2D':
+        dist = np.ceil(np.sqrt(square))
+    else:
+        # ATT: nint da pseudo-euclidiana, arredondada para cima
+        value = np.sqrt(square / 10)
+        d = np.floor(value + 0.5)
+        dist = d + (d < value)
+    return dist
+
+def distance_function(coords, kind):
+    """
+    Função d(i, j) com a distância (int) entre os vértices de índices i e j,
+    calculada com a math em vez da NumPy: a avaliação de um par isolado é
+    muito mais rápida e os arredondamentos são os mesmos de coord_distances.
+    """
+    x = coords[:, 0].tolist()
+    y = coords[:, 1].tolist()
+    if kind == 'GEO':
+        return lambda i, j: geo_distance((x[i], y[i]), (x[j], y[j]))
+
+    def distance(i, j):
+        dx = x[i] - x[j]
+        dy = y[i] - y[j]
+        square = dx*dx + dy*dy
+        if kind == 'EUC_2D':
+            return math.floor(math.sqrt(square) + 0.5)
+        if kind == 'CEIL_2D':
+            return math.ceil(math.sqrt(square))
+        value = math.sqrt(square / 10)
+        d = math.floor(value + 0.5)
+        return d + (d < value)
+    return distance
+
+def geo_radians(values):
+    """
+    Converte coordenadas GEO (graus.minutos) em radianos, como a tsplib95.
+    """
+    degrees = np.trunc(values)
+    minutes = values - degrees
+    return (degrees + minutes * 5 / 3) * (math.pi / 180)
+
+def geo_distances(start, end):
+    lat1 = geo_radians(start[..., 0])
+    lng1 = geo_radians(start[..., 1])
+    lat2 = geo_radians(end[..., 0])
+    lng2 = geo_radians(end[..., 1])
+    q1 = np.cos(lng1 - lng2)
+    q2 = np.cos(lat1 - lat2)
+    q3 = np.cos(lat1 + lat2)
+    distance = RADIUS * np.arccos(0.5 * ((1 + q1) * q2 - (1 - q1) * q3)) + 1
+    dist = np.asarray(np.trunc(distance))
+    # cos e arccos da NumPy podem diferir da libm na última casa; valores
+    # muito próximos de um inteiro são recalculados como na tsplib95
+    close = np.abs(distance - np.rint(distance)) < 1e-6
+    if close.any():
+        start, end = np.broadcast_arrays(start, end)
+        for index in map(tuple, np.argwhere(close)):
+            dist[index] = geo_distance(start[index], end[index])
+    return dist
+
+def geo_distance(start, end):
+    """
+    Distância GEO entre duas coordenadas calculada exatamente como na
+    tsplib95.
+    """
+    def radians(x):
+        degrees = int(x)
+        return math.radians(degrees + (x - degrees) * 5 / 3)
+
+    lat1, lng1 = radians(start[0]), radians(start[1])
+    lat2, lng2 = radians(end[0]), radians(end[1])
+    q1 = math.cos(lng1 - lng2)
+    q2 = math.cos(lat1 - lat2)
+    q3 = math.cos(lat1 + lat2)
+    return int(RADIUS * math.acos(0.5 * ((1 + q1) * q2 - (1 - q1) * q3)) + 1)
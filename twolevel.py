@@ -0,0 +1,266 @@
+"""
+    Rota em lista duplamente encadeada de dois níveis, para buscas 2-opt em
+    instâncias grandes.
+"""
+from math import isqrt
+
+class TwoLevelList:
+    """
+    Rota representada em dois níveis: a rota é dividida em segmentos de
+    cerca de sqrt(n) cidades, ligados em uma lista circular duplamente
+    encadeada. Cada segmento guarda suas cidades em um vetor, a ordem
+    (rank) na lista e um bit de inversão; cada cidade guarda seu segmento e
+    sua posição (seq) no vetor do segmento.
+
+    next, prev e between são O(1). Um movimento 2-opt inverte um caminho
+    dividindo no máximo dois segmentos e invertendo a ordem e o bit dos
+    segmentos inteiros do caminho (ou do caminho complementar, se for menor,
+    invertendo também o sentido global da rota), em O(sqrt n). Quando as
+    divisões dobram o número de segmentos a lista é reconstruída, em O(n),
+    o que mantém o custo amortizado.
+
+    Internamente as operações usam o sentido "bruto" dos segmentos; o
+    atributo flipped indica se o sentido da rota é o oposto.
+
+    Args:
+        cities (iterable): cidades da rota, em índices da instância.
+        size (int): número de cidades da instância. Default: maior cidade
+        da rota + 1.
+        groupSize (int): tamanho inicial dos segmentos. Default: sqrt(n).
+    """
+    def __init__(self, cities, size=None, groupSize=None):
+        cities = list(cities)
+        self.n = len(cities)
+        if size is None:
+            size = max(cities) + 1
+        self.groupSize = groupSize or max(8, isqrt(self.n))
+        self.parent = [0] * size
+        self.seq = [0] * size
+        self.flipped = False
+        self.build(cities)
+
+    def build(self, order):
+        """
+        Reconstrói os segmentos a partir das cidades em ordem bruta.
+        """
+        gs = self.groupSize
+        self.segments = [order[i:i+gs] for i in range(0, len(order), gs)]
+        m = len(self.segments)
+        self.rev = [False] * m
+        self.rank = list(range(m))
+        self.segNext = [(s+1) % m for s in range(m)]
+        self.segPrev = [(s-1) % m for s in range(m)]
+        for s, segment in enumerate(self.segments):
+            self.renumber(s)
+        self.maxSegments = 2*m + 2
+
+    def renumber(self, s):
+        parent = self.parent
+        seq = self.seq
+        for j, c in enumerate(self.segments[s]):
+            parent[c] = s
+            seq[c] = j
+
+    def rerank(self, s):
+        """
+        Renumera a ordem dos segmentos percorrendo a lista a partir de s.
+        """
+        rank = self.rank
+        segNext = self.segNext
+        for r in range(len(self.segments)):
+            rank[s] = r
+            s = segNext[s]
+
+    def head(self, s):
+        """
+        Primeira cidade do segmento s no sentido bruto.
+        """
+        return self.segments[s][-1] if self.rev[s] else self.segments[s][0]
+
+    def tail(self, s):
+        """
+        Última cidade do segmento s no sentido bruto.
+        """
+        return self.segments[s][0] if self.rev[s] else self.segments[s][-1]
+
+    def raw_next(self, c):
+        s = self.parent[c]
+        j = self.seq[c]
+        segment = self.segments[s]
+        if self.rev[s]:
+            if j > 0:
+                return segment[j-1]
+        elif j+1 < len(segment):
+            return segment[j+1]
+        return self.head(self.segNext[s])
+
+    def raw_prev(self, c):
+        s = self.parent[c]
+        j = self.seq[c]
+        segment = self.segments[s]
+        if self.rev[s]:
+            if j+1 < len(segment):
+                return segment[j+1]
+        elif j > 0:
+            return segment[j-1]
+        return self.tail(self.segPrev[s])
+
+    def key(self, c):
+        """
+        Chave que ordena as cidades no sentido bruto (ciclicamente).
+        """
+        s = self.parent[c]
+        return self.rank[s], -self.seq[c] if self.rev[s] else self.seq[c]
+
+    def raw_between(self, a, b, c):
+        ka = self.key(a)
+        kb = self.key(b)
+        kc = self.key(c)
+        if ka <= kc:
+            return ka <= kb <= kc
+        return kb >= ka or kb <= kc
+
+    def next(self, c):
+        """
+        Cidade seguinte a c na rota.
+        """
+        return self.raw_prev(c) if self.flipped else self.raw_next(c)
+
+    def prev(self, c):
+        """
+        Cidade anterior a c na rota.
+        """
+        return self.raw_next(c) if self.flipped else self.raw_prev(c)
+
+    def between(self, a, b, c):
+        """
+        Verifica se b está no caminho que vai de a até c seguindo a rota
+        (inclusive nas pontas).
+        """
+        if self.flipped:
+            return self.raw_between(c, b, a)
+        return self.raw_between(a, b, c)
+
+    def two_opt_move(self, a, b, c, d):
+        """
+        Movimento 2-opt: substitui as arestas (a, b) e (c, d), com
+        b = next(a) e d = next(c), por (a, c) e (b, d), invertendo o caminho
+        de b até c.
+        """
+        if len(self.segments) > self.maxSegments:
+            self.build(self.raw_order())
+        if self.flipped:
+            self.reverse(c, b)
+        else:
+            self.reverse(b, c)
+
+    def split(self, c):
+        """
+        Divide o segmento de c de forma que c seja sua primeira cidade no
+        sentido bruto. A parte menor vira um novo segmento.
+        """
+        s = self.parent[c]
+        if self.head(s) == c:
+            return
+        segment = self.segments[s]
+        j = self.seq[c]
+        # partes antes de c e a partir de c, no sentido bruto
+        if self.rev[s]:
+            before, after = segment[j+1:], segment[:j+1]
+        else:
+            before, after = segment[:j], segment[j:]
+
+        t = len(self.segments)
+        self.rev.append(self.rev[s])
+        self.rank.append(0)
+        if len(after) <= len(before):
+            self.segments[s] = before
+            self.segments.append(after)
+            prev, nxt = s, self.segNext[s]
+        else:
+            self.segments[s] = after
+            self.segments.append(before)
+            prev, nxt = self.segPrev[s], s
+        self.segNext.append(nxt)
+        self.segPrev.append(prev)
+        self.segNext[prev] = t
+        self.segPrev[nxt] = t
+        self.renumber(s)
+        self.renumber(t)
+        self.rerank(s)
+
+    def reverse(self, x, y):
+        """
+        Inverte o caminho de x até y no sentido bruto.
+        """
+        if self.parent[x] == self.parent[y] and self.key(x) <= self.key(y):
+            # caminho dentro de um segmento
+            s = self.parent[x]
+            i, j = sorted((self.seq[x], self.seq[y]))
+            segment = self.segments[s]
+            segment[i:j+1] = segment[i:j+1][::-1]
+            seq = self.seq
+            for p in range(i, j+1):
+                seq[segment[p]] = p
+            return
+
+        self.split(x)
+        y2 = self.raw_next(y)
+        if self.parent[y2] == self.parent[y]:
+            self.split(y2)
+
+        m = len(self.segments)
+        first = self.parent[x]
+        last = self.parent[y]
+        k = (self.rank[last] - self.rank[first]) % m + 1
+        if k == m:
+            # caminho é a rota inteira
+            self.flipped = not self.flipped
+            return
+        if 2*k > m:
+            # inverte o caminho complementar e o sentido da rota
+            first, last = self.segNext[last], self.segPrev[first]
+            k = m - k
+            self.flipped = not self.flipped
+
+        before = self.segPrev[first]
+        after = self.segNext[last]
+        run = []
+        s = first
+        for _ in range(k):
+            run.append(s)
+            s = self.segNext[s]
+        r0 = self.rank[first]
+        prev = before
+        for t, s in enumerate(reversed(run)):
+            self.rev[s] = not self.rev[s]
+            self.rank[s] = (r0 + t) % m
+            self.segNext[prev] = s
+            self.segPrev[s] = prev
+            prev = s
+        self.segNext[prev] = after
+        self.segPrev[after] = prev
+
+    def raw_order(self):
+        """
+        Cidades no sentido bruto, a partir do segmento de ordem 0.
+        """
+        s = self.rank.index(0)
+        order = []
+        for _ in range(len(self.segments)):
+            segment = self.segments[s]
+            order.extend(reversed(segment) if self.rev[s] else segment)
+            s = self.segNext[s]
+        return order
+
+    def tolist(self, start=None):
+        """
+        Cidades da rota a partir de start, no sentido da rota.
+        """
+        order = self.raw_order()
+        if self.flipped:
+            order.reverse()
+        if start is not None:
+            p = order.index(start)
+            order = order[p:] + order[:p]
+        return order